@@ -1,4 +1,5 @@
 from django.apps import AppConfig
+from django.db.backends.signals import connection_created
 from django.utils.translation import gettext_lazy as _
 
 
@@ -6,3 +7,15 @@ class CommonConfig(AppConfig):
     default_auto_field = "django.db.models.BigAutoField"
     name = "apps.common"
     verbose_name = _("Common")
+
+    def ready(self):
+        from apps.common.db import apply_sqlite_pragmas
+        from apps.common.middleware import install_query_timer
+        from apps.common.querylog import install_query_logger
+
+        connection_created.connect(apply_sqlite_pragmas)
+        # Both go first in the wrapper list; connecting the timer first
+        # leaves it inside the query logger, so the logger's own work is
+        # not counted as DB time.
+        connection_created.connect(install_query_timer)
+        connection_created.connect(install_query_logger)
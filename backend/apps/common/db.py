@@ -0,0 +1,26 @@
+from django.conf import settings
+
+
+def apply_sqlite_pragmas(sender, connection, **kwargs):
+    """
+    ``connection_created`` receiver applying ``SQLITE_PRAGMAS``: WAL lets
+    readers run alongside the writer, and the busy timeout makes writers
+    wait for each other instead of failing with "database is locked".
+    """
+    if connection.vendor != "sqlite":
+        return
+    with connection.cursor() as cursor:
+        for name, value in settings.SQLITE_PRAGMAS.items():
+            cursor.execute(f"PRAGMA {name} = {value}")
+
+
+def sqlite_pragmas(connection):
+    """Current values of the ``SQLITE_PRAGMAS`` settings on ``connection``."""
+    values = {}
+    with connection.cursor() as cursor:
+        for name in settings.SQLITE_PRAGMAS:
+            cursor.execute(f"PRAGMA {name}")
+            row = cursor.fetchone()
+            # In-memory databases report nothing for some (mmap_size).
+            values[name] = row[0] if row else None
+    return values
@@ -0,0 +1,58 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from apps.common.querylog import QueryStats
+
+ORDERINGS = {
+    "total": "seconds",
+    "mean": "mean_seconds",
+    "max": "max_seconds",
+    "calls": "calls",
+    "slow": "slow_calls",
+}
+
+
+class Command(BaseCommand):
+    help = "Show the heaviest SQL fingerprints recorded by the query logger"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--top", type=int, default=20)
+        parser.add_argument("--order-by", choices=sorted(ORDERINGS), default="total")
+        parser.add_argument(
+            "--samples",
+            action="store_true",
+            help="Also print the slowest raw statement and its view.",
+        )
+        parser.add_argument(
+            "--reset", action="store_true", help="Clear the recorded stats."
+        )
+
+    def handle(self, *args, **options):
+        if not settings.QUERY_STATS_PATH:
+            raise CommandError(
+                "QUERY_STATS_PATH is not set, so query stats only live in the "
+                "memory of each server process."
+            )
+        stats = QueryStats(settings.QUERY_STATS_PATH)
+        if options["reset"]:
+            stats.clear()
+            self.stdout.write(self.style.SUCCESS("Query stats cleared."))
+            return
+
+        rows = stats.top(options["top"], ORDERINGS[options["order_by"]])
+        if not rows:
+            self.stdout.write("No queries recorded yet.")
+            return
+        self.stdout.write(
+            f"{'calls':>8} {'total ms':>11} {'mean ms':>9} {'max ms':>9} "
+            f"{'slow':>6}  fingerprint"
+        )
+        for row in rows:
+            self.stdout.write(
+                f"{row['calls']:>8} {row['seconds'] * 1000:>11.1f} "
+                f"{row['mean_seconds'] * 1000:>9.2f} "
+                f"{row['max_seconds'] * 1000:>9.2f} {row['slow_calls']:>6}  "
+                f"{row['fingerprint']}"
+            )
+            if options["samples"]:
+                self.stdout.write(f"{'':>47}slowest in {row['view']}: {row['sample']}")
@@ -0,0 +1,244 @@
+import sqlite3
+import threading
+import time
+from collections import defaultdict
+
+from django.conf import settings
+
+# Upper bounds (seconds) of the request latency histogram buckets.
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+LABELS = ("method", "view", "status")
+
+
+def _empty():
+    return {
+        "count": 0,
+        "seconds": 0.0,
+        "queries": 0,
+        "db_seconds": 0.0,
+        "buckets": [0] * len(LATENCY_BUCKETS),
+    }
+
+
+def _add(totals, count, seconds, queries, db_seconds, buckets):
+    totals["count"] += count
+    totals["seconds"] += seconds
+    totals["queries"] += queries
+    totals["db_seconds"] += db_seconds
+    for index, value in enumerate(buckets):
+        totals["buckets"][index] += value
+
+
+def _bucket_counts(seconds):
+    return [int(seconds <= bound) for bound in LATENCY_BUCKETS]
+
+
+class MemoryStore:
+    """Per-process request metrics keyed by ``(method, view, status)``."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.series = defaultdict(_empty)
+
+    def record(self, key, seconds, queries, db_seconds):
+        with self.lock:
+            _add(
+                self.series[key],
+                1,
+                seconds,
+                queries,
+                db_seconds,
+                _bucket_counts(seconds),
+            )
+
+    def snapshot(self):
+        with self.lock:
+            return {
+                key: {**totals, "buckets": list(totals["buckets"])}
+                for key, totals in self.series.items()
+            }
+
+    def clear(self):
+        with self.lock:
+            self.series.clear()
+
+
+class SQLiteStore(MemoryStore):
+    """
+    Metrics shared by every worker on the host through a local SQLite file.
+    Requests are buffered in memory and added to the file at most every
+    ``flush_interval`` seconds (and before each snapshot), so the request
+    path never waits on the file.
+    """
+
+    def __init__(self, path, flush_interval=5.0):
+        super().__init__()
+        self.path = str(path)
+        self.flush_interval = flush_interval
+        self.flushed_at = time.monotonic()
+        with self.connect() as db:
+            db.execute(
+                """
+                CREATE TABLE IF NOT EXISTS request_metrics (
+                    method TEXT, view TEXT, status TEXT,
+                    count INTEGER, seconds REAL, queries INTEGER,
+                    db_seconds REAL, buckets TEXT,
+                    PRIMARY KEY (method, view, status)
+                )
+                """
+            )
+
+    def connect(self):
+        db = sqlite3.connect(self.path, timeout=10, isolation_level=None)
+        db.execute("PRAGMA journal_mode=WAL")
+        db.execute("PRAGMA synchronous=NORMAL")
+        return db
+
+    def record(self, key, seconds, queries, db_seconds):
+        super().record(key, seconds, queries, db_seconds)
+        if time.monotonic() - self.flushed_at >= self.flush_interval:
+            self.flush()
+
+    def flush(self):
+        with self.lock:
+            pending = dict(self.series)
+            self.series.clear()
+            self.flushed_at = time.monotonic()
+        if not pending:
+            return
+
+        db = self.connect()
+        try:
+            db.execute("BEGIN IMMEDIATE")
+            for key, delta in pending.items():
+                row = db.execute(
+                    "SELECT count, seconds, queries, db_seconds, buckets "
+                    "FROM request_metrics WHERE method = ? AND view = ? "
+                    "AND status = ?",
+                    key,
+                ).fetchone()
+                totals = _empty()
+                if row:
+                    buckets = [int(value) for value in row[4].split(",")]
+                    _add(totals, *row[:4], buckets)
+                _add(totals, *_row(delta))
+                db.execute(
+                    "INSERT OR REPLACE INTO request_metrics "
+                    "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                    (*key, *_row(totals)[:4], _join(totals["buckets"])),
+                )
+            db.execute("COMMIT")
+        finally:
+            db.close()
+
+    def snapshot(self):
+        self.flush()
+        db = self.connect()
+        try:
+            rows = db.execute("SELECT * FROM request_metrics").fetchall()
+        finally:
+            db.close()
+        series = {}
+        for method, view, status, *values, buckets in rows:
+            totals = series[(method, view, status)] = _empty()
+            _add(totals, *values, [int(value) for value in buckets.split(",")])
+        return series
+
+    def clear(self):
+        super().clear()
+        db = self.connect()
+        try:
+            db.execute("DELETE FROM request_metrics")
+        finally:
+            db.close()
+
+
+def _row(totals):
+    return (
+        totals["count"],
+        totals["seconds"],
+        totals["queries"],
+        totals["db_seconds"],
+        totals["buckets"],
+    )
+
+
+def _join(buckets):
+    return ",".join(str(value) for value in buckets)
+
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def get_store():
+    """
+    The process-wide store: ``SQLiteStore`` when ``METRICS_STORE_PATH`` is
+    set (share it between workers on one host), ``MemoryStore`` otherwise.
+    """
+    global _store
+    if _store is None:
+        with _store_lock:
+            if _store is None:
+                path = getattr(settings, "METRICS_STORE_PATH", "")
+                _store = SQLiteStore(path) if path else MemoryStore()
+    return _store
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _labels(key, **extra):
+    pairs = [*zip(LABELS, key), *extra.items()]
+    return ",".join(f'{name}="{_escape(value)}"' for name, value in pairs)
+
+
+def render_prometheus(series):
+    """Render a store snapshot in the Prometheus text exposition format."""
+    keys = sorted(series)
+    lines = [
+        "# HELP http_requests_total Requests served, by view and status.",
+        "# TYPE http_requests_total counter",
+    ]
+    lines += [
+        f"http_requests_total{{{_labels(key)}}} {series[key]['count']}"
+        for key in keys
+    ]
+
+    lines += [
+        "# HELP http_request_duration_seconds Request latency.",
+        "# TYPE http_request_duration_seconds histogram",
+    ]
+    for key in keys:
+        totals = series[key]
+        for bound, count in zip(LATENCY_BUCKETS, totals["buckets"]):
+            labels = _labels(key, le=bound)
+            lines.append(f"http_request_duration_seconds_bucket{{{labels}}} {count}")
+        labels = _labels(key, le="+Inf")
+        lines += [
+            f"http_request_duration_seconds_bucket{{{labels}}} {totals['count']}",
+            f"http_request_duration_seconds_sum{{{_labels(key)}}} "
+            f"{totals['seconds']:.6f}",
+            f"http_request_duration_seconds_count{{{_labels(key)}}} "
+            f"{totals['count']}",
+        ]
+
+    lines += [
+        "# HELP http_request_db_queries_total Database queries run by requests.",
+        "# TYPE http_request_db_queries_total counter",
+    ]
+    lines += [
+        f"http_request_db_queries_total{{{_labels(key)}}} {series[key]['queries']}"
+        for key in keys
+    ]
+    lines += [
+        "# HELP http_request_db_seconds_total Time requests spent in the database.",
+        "# TYPE http_request_db_seconds_total counter",
+    ]
+    lines += [
+        f"http_request_db_seconds_total{{{_labels(key)}}} "
+        f"{series[key]['db_seconds']:.6f}"
+        for key in keys
+    ]
+    return "\n".join(lines) + "\n"
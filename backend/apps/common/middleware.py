@@ -0,0 +1,155 @@
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from rest_framework.permissions import SAFE_METHODS
+
+from .metrics import get_store
+from .querylog import current_view
+from .routers import replica_configured, request_scope
+
+
+class QueryTimer:
+    """``execute_wrapper`` that counts queries and the time spent in them."""
+
+    def __init__(self):
+        self.queries = 0
+        self.seconds = 0.0
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.seconds += time.perf_counter() - started
+            self.queries += 1
+
+
+# Timer of the request being served. Context variables follow the request
+# into sync_to_async threads, whose connections differ from the ones of
+# the thread running the middleware.
+current_timer = ContextVar("query_timer", default=None)
+
+
+def time_queries(execute, sql, params, many, context):
+    timer = current_timer.get()
+    if timer is None:
+        return execute(sql, params, many, context)
+    return timer(execute, sql, params, many, context)
+
+
+def install_query_timer(sender, connection, **kwargs):
+    """``connection_created`` receiver adding ``time_queries`` once."""
+    if time_queries not in connection.execute_wrappers:
+        connection.execute_wrappers.insert(0, time_queries)
+
+
+class RequestMetricsMiddleware:
+    """
+    Record count, latency, query count and DB time of every request under
+    its URL name (``pool-list``, ``financial-report``...), so the number of
+    series stays bounded whatever the ids in the path. Streaming responses
+    are only timed until the response object is returned.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.is_async = iscoroutinefunction(get_response)
+        if self.is_async:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.is_async:
+            return self.__acall__(request)
+        timer = QueryTimer()
+        with self.instrument(request, timer):
+            started = time.perf_counter()
+            response = self.get_response(request)
+        self.record(request, response, time.perf_counter() - started, timer)
+        return response
+
+    async def __acall__(self, request):
+        timer = QueryTimer()
+        with self.instrument(request, timer):
+            started = time.perf_counter()
+            response = await self.get_response(request)
+        self.record(request, response, time.perf_counter() - started, timer)
+        return response
+
+    @contextmanager
+    def instrument(self, request, timer):
+        view_token = current_view.set(request.path)
+        timer_token = current_timer.set(timer)
+        try:
+            yield
+        finally:
+            current_timer.reset(timer_token)
+            current_view.reset(view_token)
+
+    def record(self, request, response, seconds, timer):
+        match = getattr(request, "resolver_match", None)
+        view = (match.view_name or match.route) if match else "unmatched"
+        key = (request.method, view, str(response.status_code))
+        get_store().record(key, seconds, timer.queries, timer.seconds)
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        # Name the view for the slow-query log once the URL is resolved.
+        match = request.resolver_match
+        current_view.set(match.view_name or match.route)
+
+
+class PrimaryStickinessMiddleware:
+    """
+    Scope read routing to the request and give clients read-your-writes: a
+    successful write sets a cookie that keeps the client's reads on the
+    primary for ``REPLICA_STICKY_SECONDS``, longer than the replica lags.
+    """
+
+    sync_capable = True
+    async_capable = True
+    cookie_name = "db_primary_until"
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.is_async = iscoroutinefunction(get_response)
+        if self.is_async:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.is_async:
+            return self.__acall__(request)
+        with request_scope(self.pinned(request)):
+            response = self.get_response(request)
+        return self.stick(request, response)
+
+    async def __acall__(self, request):
+        with request_scope(self.pinned(request)):
+            response = await self.get_response(request)
+        return self.stick(request, response)
+
+    def pinned(self, request):
+        try:
+            return float(request.COOKIES.get(self.cookie_name, 0)) > time.time()
+        except ValueError:
+            return False
+
+    def stick(self, request, response):
+        if (
+            replica_configured()
+            and request.method not in SAFE_METHODS
+            and response.status_code < 400
+        ):
+            seconds = settings.REPLICA_STICKY_SECONDS
+            response.set_cookie(
+                self.cookie_name,
+                str(time.time() + seconds),
+                max_age=seconds,
+                httponly=True,
+                samesite="Lax",
+            )
+        return response
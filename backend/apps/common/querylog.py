@@ -0,0 +1,217 @@
+import logging
+import re
+import sqlite3
+import threading
+import time
+from contextvars import ContextVar
+from functools import lru_cache
+
+from django.conf import settings
+from django.db import DatabaseError
+
+logger = logging.getLogger(__name__)
+
+# View (URL name) of the request being served, set by the metrics middleware.
+current_view = ContextVar("current_view", default="-")
+_explaining = ContextVar("explaining", default=False)
+
+_STRING = re.compile(r"'(?:[^']|'')*'")
+_NUMBER = re.compile(r"(?<![\w\"])-?\d+(?:\.\d+)?\b")
+_PLACEHOLDER = re.compile(r"%s|\?")
+_IN_LIST = re.compile(r"\(\s*\?(?:\s*,\s*\?)*\s*\)")
+_SPACE = re.compile(r"\s+")
+_READ = re.compile(r"\s*(SELECT|WITH)\b", re.IGNORECASE)
+
+
+@lru_cache(maxsize=2048)
+def fingerprint(sql):
+    """
+    Normalise ``sql`` so queries that differ only in their values group
+    together: literals and placeholders become ``?`` and ``IN`` lists of
+    any length collapse to ``(...)``.
+    """
+    sql = _STRING.sub("?", sql)
+    sql = _NUMBER.sub("?", sql)
+    sql = _PLACEHOLDER.sub("?", sql)
+    sql = _IN_LIST.sub("(...)", sql)
+    return _SPACE.sub(" ", sql).strip()
+
+
+class QueryStats:
+    """
+    Calls, total and max time per fingerprint. Kept in memory and added to
+    the SQLite file at ``path`` (if any) every ``flush_interval`` seconds,
+    so every worker and the ``slow_queries`` command see the same totals.
+    """
+
+    def __init__(self, path="", flush_interval=5.0):
+        self.path = str(path)
+        self.flush_interval = flush_interval
+        self.flushed_at = time.monotonic()
+        self.lock = threading.Lock()
+        self.pending = {}
+        if self.path:
+            with self.connect() as db:
+                db.execute(
+                    """
+                    CREATE TABLE IF NOT EXISTS query_stats (
+                        fingerprint TEXT PRIMARY KEY,
+                        calls INTEGER, seconds REAL, max_seconds REAL,
+                        slow_calls INTEGER, sample TEXT, view TEXT
+                    )
+                    """
+                )
+
+    def connect(self):
+        db = sqlite3.connect(self.path, timeout=10, isolation_level=None)
+        db.execute("PRAGMA journal_mode=WAL")
+        db.execute("PRAGMA synchronous=NORMAL")
+        return db
+
+    def record(self, key, sql, seconds, slow, view):
+        with self.lock:
+            stats = self.pending.get(key)
+            if stats is None:
+                stats = self.pending[key] = [0, 0.0, 0.0, 0, sql, view]
+            stats[0] += 1
+            stats[1] += seconds
+            stats[2] = max(stats[2], seconds)
+            stats[3] += slow
+            if seconds >= stats[2]:
+                stats[4], stats[5] = sql, view
+        if self.path and time.monotonic() - self.flushed_at >= self.flush_interval:
+            self.flush()
+
+    def flush(self):
+        if not self.path:
+            return
+        with self.lock:
+            pending, self.pending = self.pending, {}
+            self.flushed_at = time.monotonic()
+        if not pending:
+            return
+        db = self.connect()
+        try:
+            db.executemany(
+                """
+                INSERT INTO query_stats VALUES (?, ?, ?, ?, ?, ?, ?)
+                ON CONFLICT (fingerprint) DO UPDATE SET
+                    calls = calls + excluded.calls,
+                    seconds = seconds + excluded.seconds,
+                    slow_calls = slow_calls + excluded.slow_calls,
+                    sample = CASE WHEN excluded.max_seconds >= max_seconds
+                        THEN excluded.sample ELSE sample END,
+                    view = CASE WHEN excluded.max_seconds >= max_seconds
+                        THEN excluded.view ELSE view END,
+                    max_seconds = MAX(max_seconds, excluded.max_seconds)
+                """,
+                [(key, *stats) for key, stats in pending.items()],
+            )
+        finally:
+            db.close()
+
+    def top(self, limit=20, order_by="seconds"):
+        """The ``limit`` heaviest fingerprints as dicts, by ``order_by``."""
+        columns = ["fingerprint", "calls", "seconds", "max_seconds", "slow_calls"]
+        columns += ["sample", "view"]
+        if self.path:
+            self.flush()
+            db = self.connect()
+            try:
+                rows = db.execute(f"SELECT {', '.join(columns)} FROM query_stats")
+                rows = rows.fetchall()
+            finally:
+                db.close()
+        else:
+            with self.lock:
+                rows = [(key, *stats) for key, stats in self.pending.items()]
+
+        stats = [dict(zip(columns, row)) for row in rows]
+        for row in stats:
+            row["mean_seconds"] = row["seconds"] / row["calls"]
+        stats.sort(key=lambda row: row[order_by], reverse=True)
+        return stats[:limit]
+
+    def clear(self):
+        with self.lock:
+            self.pending = {}
+        if self.path:
+            db = self.connect()
+            try:
+                db.execute("DELETE FROM query_stats")
+            finally:
+                db.close()
+
+
+_stats = None
+_stats_lock = threading.Lock()
+
+
+def get_query_stats():
+    global _stats
+    if _stats is None:
+        with _stats_lock:
+            if _stats is None:
+                _stats = QueryStats(getattr(settings, "QUERY_STATS_PATH", ""))
+    return _stats
+
+
+def explain(connection, sql, params):
+    """The query plan of ``sql`` as text, or ``None`` if it has none."""
+    if not _READ.match(sql):
+        return None
+    prefix = "EXPLAIN QUERY PLAN" if connection.vendor == "sqlite" else "EXPLAIN"
+    token = _explaining.set(True)
+    try:
+        with connection.cursor() as cursor:
+            cursor.execute(f"{prefix} {sql}", params)
+            rows = cursor.fetchall()
+    except DatabaseError as error:
+        return f"unavailable: {error}"
+    finally:
+        _explaining.reset(token)
+    return "\n".join(str(row[-1]) for row in rows)
+
+
+class QueryLogger:
+    """
+    Execute wrapper installed on every connection: adds each query to
+    ``QueryStats`` under its fingerprint and logs queries slower than
+    ``SLOW_QUERY_MS`` with their plan and the view that ran them.
+    """
+
+    def __call__(self, execute, sql, params, many, context):
+        if _explaining.get():
+            return execute(sql, params, many, context)
+
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            seconds = time.perf_counter() - started
+            view = current_view.get()
+            slow = seconds * 1000 >= settings.SLOW_QUERY_MS
+            get_query_stats().record(fingerprint(sql), sql, seconds, slow, view)
+            if slow:
+                plan = None if many else explain(context["connection"], sql, params)
+                logger.warning(
+                    "Slow query (%.1f ms) in %s: %s\nParams: %r\nPlan:\n%s",
+                    seconds * 1000,
+                    view,
+                    sql,
+                    params,
+                    plan or "-",
+                )
+
+
+query_logger = QueryLogger()
+
+
+def install_query_logger(sender, connection, **kwargs):
+    """
+    ``connection_created`` receiver adding ``query_logger`` once. It goes
+    first in the list: ``execute_wrapper()`` blocks pop the last wrapper on
+    exit, and the connection may be opened inside one.
+    """
+    if query_logger not in connection.execute_wrappers:
+        connection.execute_wrappers.insert(0, query_logger)
@@ -0,0 +1,94 @@
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.db import connections
+from rest_framework.permissions import SAFE_METHODS
+
+REPLICA = "replica"
+
+_replica_reads = ContextVar("replica_reads", default=False)
+_pinned_to_primary = ContextVar("pinned_to_primary", default=False)
+
+
+def replica_configured():
+    return REPLICA in settings.DATABASES
+
+
+@contextmanager
+def replica_reads(enabled=True):
+    """Let reads inside the block go to the replica, when there is one."""
+    token = _replica_reads.set(enabled)
+    try:
+        yield
+    finally:
+        _replica_reads.reset(token)
+
+
+@contextmanager
+def request_scope(pinned=False):
+    """
+    Scope the routing state to one request; ``pinned`` sends every read to
+    the primary (the client wrote moments ago).
+    """
+    token = _pinned_to_primary.set(pinned)
+    try:
+        yield
+    finally:
+        _pinned_to_primary.reset(token)
+
+
+def pinned_to_primary():
+    return _pinned_to_primary.get()
+
+
+def reading_from_replica():
+    """Whether reads made now go to the replica."""
+    return (
+        _replica_reads.get()
+        and not _pinned_to_primary.get()
+        and replica_configured()
+        and not connections["default"].in_atomic_block
+    )
+
+
+class ReplicaRouter:
+    """
+    Reads go to ``replica`` only inside ``replica_reads()`` (report, export
+    and list views) and only until the request writes: after the first
+    write, or inside a transaction, reads stay on ``default`` so a request
+    always sees its own changes. Writes always go to ``default``.
+    """
+
+    def db_for_read(self, model, **hints):
+        return REPLICA if reading_from_replica() else "default"
+
+    def db_for_write(self, model, **hints):
+        _pinned_to_primary.set(True)
+        return "default"
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Both aliases hold the same data.
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        return db != REPLICA
+
+
+class ReplicaReadMixin:
+    """
+    Serve safe requests for ``replica_actions`` (all of them when None)
+    from the replica.
+    """
+
+    replica_actions = None
+
+    def dispatch(self, request, *args, **kwargs):
+        # ``self.action`` is only set once ``dispatch`` initialises the
+        # request, so resolve it from the viewset's method map.
+        action = getattr(self, "action_map", {}).get(request.method.lower())
+        enabled = request.method in SAFE_METHODS and (
+            self.replica_actions is None or action in self.replica_actions
+        )
+        with replica_reads(enabled):
+            return super().dispatch(request, *args, **kwargs)
@@ -1,3 +1,21 @@
-from django.shortcuts import render
+from django.conf import settings
+from django.http import HttpResponse, HttpResponseForbidden
+from django.utils.crypto import constant_time_compare
 
-# Create your views here.
+from .metrics import get_store, render_prometheus
+
+PROMETHEUS_CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+def metrics(request):
+    """
+    Request metrics in the Prometheus text format. When ``METRICS_TOKEN``
+    is set, scrapers must send it as ``Authorization: Bearer <token>``.
+    """
+    token = getattr(settings, "METRICS_TOKEN", "")
+    if token:
+        header = request.headers.get("Authorization", "")
+        if not constant_time_compare(header, f"Bearer {token}"):
+            return HttpResponseForbidden()
+    body = render_prometheus(get_store().snapshot())
+    return HttpResponse(body, content_type=PROMETHEUS_CONTENT_TYPE)
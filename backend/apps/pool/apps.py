@@ -1,6 +1,28 @@
 from django.apps import AppConfig
+from django.db.models.signals import post_migrate
+
+
+def install_search(sender, using="default", **kwargs):
+    from apps.pool.search import install_pool_search
+
+    install_pool_search(using)
+
+
+def install_cabinets(sender, using="default", **kwargs):
+    from django.conf import settings
+
+    from apps.pool.cabinets import claim_held_cabinets, provision_cabinets
+
+    provision_cabinets(settings.POOL_CABINET_COUNT)
+    claim_held_cabinets()
 
 
 class PoolConfig(AppConfig):
     default_auto_field = "django.db.models.BigAutoField"
     name = "apps.pool"
+
+    def ready(self):
+        from apps.pool import signals
+
+        post_migrate.connect(install_search, sender=self)
+        post_migrate.connect(install_cabinets, sender=self)
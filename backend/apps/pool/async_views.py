@@ -0,0 +1,192 @@
+"""
+Read-only async variants of the pool, shop and report endpoints.
+
+They are plain Django ``async def`` views (DRF views are synchronous), so
+under ASGI a request waiting on the database does not hold a worker
+thread. Authentication, filtering, search, ordering and page-number
+pagination match the DRF views, and reads go to the replica like the DRF
+list and report views do; writes, caching, conditional GET and cursor
+pagination stay on the synchronous API.
+"""
+
+from functools import wraps
+
+from asgiref.sync import sync_to_async
+from django.http import HttpResponse
+from rest_framework.exceptions import (
+    APIException,
+    MethodNotAllowed,
+    NotAuthenticated,
+    NotFound,
+    ValidationError,
+)
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+from rest_framework_simplejwt.authentication import JWTAuthentication
+
+from apps.common.renderers import FastJSONRenderer
+from apps.common.routers import replica_reads
+
+from .filters import POOL_ORDERING_FIELDS, PoolFilter, ShopFilter
+from .models import Pool, Shop
+from .pagination import CustomerUserPagination
+from .reports import abuild_financial_report
+from .search import search_pools
+from .serializers import (
+    PoolSerializer,
+    ReportQuerySerializer,
+    ReportRowSerializer,
+    ShopSerializer,
+)
+
+RENDERER = FastJSONRenderer()
+
+POOLS = Pool.objects.prefetch_related("shop_items").order_by("-created_at")
+SHOPS = Shop.objects.order_by("-created_at")
+
+
+async def authenticate(request):
+    """Resolve the JWT bearer token to a user, as ``JWTAuthentication`` does."""
+    authenticator = JWTAuthentication()
+    result = await sync_to_async(authenticator.authenticate)(request)
+    if result is None:
+        raise NotAuthenticated()
+    return result[0]
+
+
+def json_response(data, status=200):
+    return HttpResponse(
+        RENDERER.render(data), content_type=RENDERER.media_type, status=status
+    )
+
+
+def async_api_view(view):
+    """
+    Authenticate GET requests and turn the view's return value, or any DRF
+    ``APIException`` it raises, into a JSON response.
+    """
+
+    @wraps(view)
+    async def wrapper(request, *args, **kwargs):
+        try:
+            if request.method != "GET":
+                raise MethodNotAllowed(request.method)
+            request.user = await authenticate(request)
+            with replica_reads():
+                data = await view(request, *args, **kwargs)
+        except APIException as error:
+            detail = error.detail
+            if not isinstance(detail, (dict, list)):
+                detail = {"detail": detail}
+            response = json_response(detail, status=error.status_code)
+            if isinstance(error, NotAuthenticated):
+                response["WWW-Authenticate"] = 'Bearer realm="api"'
+            return response
+        return json_response(data)
+
+    return wrapper
+
+
+def _filter(request, queryset, filterset_class, pool_field, ordering_fields=()):
+    # FilterSet validation may query (e.g. the ``user`` choice), so this
+    # runs in a thread.
+    filterset = filterset_class(request.GET, queryset=queryset, request=request)
+    if not filterset.is_valid():
+        raise ValidationError(filterset.errors)
+    queryset = filterset.qs
+    term = request.GET.get("search", "").strip()
+    if term:
+        queryset = search_pools(queryset, term, pool_field)
+    # As OrderingFilter does: unknown fields are dropped, and the default
+    # order stays when none is left.
+    ordering = [
+        term.strip()
+        for term in request.GET.get("ordering", "").split(",")
+        if term.strip().lstrip("-") in ordering_fields
+    ]
+    if ordering:
+        queryset = queryset.order_by(*ordering)
+    return queryset
+
+
+def _page_link(request, page, last):
+    if page < 1 or page > last:
+        return None
+    url = request.build_absolute_uri()
+    if page == 1:
+        return remove_query_param(url, "page")
+    return replace_query_param(url, "page", page)
+
+
+async def paginate(request, queryset, serializer_class):
+    """Page-number pagination with the same envelope as the DRF views."""
+    paginator = CustomerUserPagination
+    size = paginator.page_size
+    try:
+        requested = int(request.GET.get(paginator.page_size_query_param, ""))
+    except ValueError:
+        requested = 0
+    if requested > 0:
+        size = min(requested, paginator.max_page_size)
+    try:
+        page = int(request.GET.get("page", 1))
+    except ValueError:
+        raise NotFound("Invalid page.")
+
+    count = await queryset.acount()
+    last = max(1, -(-count // size))
+    if page < 1 or page > last:
+        raise NotFound("Invalid page.")
+
+    offset = (page - 1) * size
+    rows = [row async for row in queryset[offset : offset + size]]
+    return {
+        "count": count,
+        "next": _page_link(request, page + 1, last),
+        "previous": _page_link(request, page - 1, last),
+        "results": serializer_class(rows, many=True).data,
+    }
+
+
+@async_api_view
+async def pool_list(request):
+    pools = await sync_to_async(_filter)(
+        request, POOLS, PoolFilter, "pk", POOL_ORDERING_FIELDS
+    )
+    return await paginate(request, pools, PoolSerializer)
+
+
+@async_api_view
+async def pool_detail(request, pk):
+    try:
+        pool = await POOLS.aget(pk=pk)
+    except Pool.DoesNotExist:
+        raise NotFound()
+    return PoolSerializer(pool).data
+
+
+@async_api_view
+async def shop_list(request):
+    shops = await sync_to_async(_filter)(request, SHOPS, ShopFilter, "pool_customer")
+    return await paginate(request, shops, ShopSerializer)
+
+
+@async_api_view
+async def shop_detail(request, pk):
+    try:
+        shop = await SHOPS.aget(pk=pk)
+    except Shop.DoesNotExist:
+        raise NotFound()
+    return ShopSerializer(shop).data
+
+
+@async_api_view
+async def financial_report(request):
+    params = ReportQuerySerializer(data=request.GET)
+    params.is_valid(raise_exception=True)
+    rows = await abuild_financial_report(**params.validated_data)
+    return {
+        "start": params.validated_data["start"],
+        "end": params.validated_data["end"],
+        "granularity": params.validated_data["granularity"],
+        "results": ReportRowSerializer(rows, many=True).data,
+    }
@@ -0,0 +1,290 @@
+import json
+import time
+import tracemalloc
+import uuid
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.db import connection, transaction
+from django.test.utils import (
+    CaptureQueriesContext,
+    setup_test_environment,
+    teardown_test_environment,
+)
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import AccessToken
+
+from apps.common.renderers import FastJSONRenderer
+
+from .cabinets import provision_cabinets
+from .cache import bump_data_version
+from .datagen import chunk_plan, generate_chunk
+from .models import Pool, Shop
+from .serializers import PoolSerializer
+
+User = get_user_model()
+
+SEED_BATCH_SIZE = 5000
+PERCENTILES = [50, 90, 95, 99]
+
+# name, method, url name, query string, request body
+SCENARIOS = [
+    ("pool-list", "get", "pool-list", "", None),
+    ("pool-list-open", "get", "pool-list", "is_calculated=false", None),
+    ("pool-list-search", "get", "pool-list", "search=Test+42", None),
+    ("pool-list-cursor", "get", "pool-list", "pagination=cursor", None),
+    ("pool-detail", "get", "pool-detail", "", None),
+    (
+        "pool-create",
+        "post",
+        "pool-list",
+        "",
+        {"name": "Bench", "num_people": 2, "total_pay": "10.00", "tools": []},
+    ),
+    ("shop-list", "get", "shop-list", "", None),
+    ("shop-list-total", "get", "shop-list", "total__gte=100", None),
+    ("shop-detail", "get", "shop-detail", "", None),
+    ("shop-create", "post", "shop-list", "", {"list": {"item_0": "12.50"}}),
+]
+
+RENDERERS = [("drf", JSONRenderer), ("fast", FastJSONRenderer)]
+
+
+def percentile(ordered, percent):
+    """Nearest-rank percentile of an already sorted list."""
+    if not ordered:
+        return None
+    rank = max(1, -(-len(ordered) * percent // 100))
+    return ordered[rank - 1]
+
+
+@contextmanager
+def client_environment():
+    """
+    ``setup_test_environment()`` for the test client, unless a test runner
+    already did it.
+    """
+    try:
+        setup_test_environment()
+    except RuntimeError:
+        yield
+        return
+    try:
+        yield
+    finally:
+        teardown_test_environment()
+
+
+def create_user():
+    return User.objects.create_user(
+        first_name="bench",
+        last_name="user",
+        email=f"benchmark-{uuid.uuid4().hex[:12]}@example.com",
+        password=None,
+    )
+
+
+def seed(user, pools, shops, seed_value=0, days=30):
+    """
+    Write ``pools``/``shops`` rows for ``user`` with the load generator and
+    return the ids the detail scenarios read.
+    """
+    now = timezone.now()
+    for index, pool_count, shop_count in chunk_plan(pools, shops, SEED_BATCH_SIZE):
+        generate_chunk(
+            index=index,
+            pool_count=pool_count,
+            shop_count=shop_count,
+            user_ids=[user.pk],
+            seed=seed_value,
+            now=now,
+            days=days,
+            max_items=5,
+            catalog_size=50,
+        )
+    latest = {
+        "pool": Pool.objects.filter(user=user),
+        "shop": Shop.objects.filter(user=user),
+    }
+    return {
+        model: queryset.order_by("-created_at").values_list("pk", flat=True)[0]
+        for model, queryset in latest.items()
+    }
+
+
+def request_args(scenario, ids):
+    _, method, url_name, query, body = scenario
+    if url_name.endswith("-detail"):
+        # Build detail paths from the list route: "shop-detail" is also
+        # the name of the legacy PATCH-only shop view.
+        model = url_name.split("-")[0]
+        path = f"{reverse(f'{model}-list')}{ids[model]}/"
+    else:
+        path = reverse(url_name)
+    if query:
+        path = f"{path}?{query}"
+    if body is not None and url_name.startswith("shop"):
+        body = {**body, "pool_customer": ids["pool"]}
+    return method, path, body
+
+
+def measure(client, scenario, ids, iterations, warmup=2, cached=False):
+    """
+    Time ``iterations`` requests of one scenario. Unless ``cached``, the
+    list cache is bypassed by bumping the data version before each request
+    (outside the timed section). Peak memory comes from one extra request
+    under tracemalloc, so tracing does not skew the latencies.
+    """
+    method, path, body = request_args(scenario, ids)
+    send = getattr(client, method)
+
+    def call():
+        if not cached:
+            bump_data_version()
+        return send(path, body, format="json") if body is not None else send(path)
+
+    for _ in range(warmup):
+        call()
+
+    latencies = []
+    queries = []
+    status_codes = set()
+    for _ in range(iterations):
+        with CaptureQueriesContext(connection) as captured:
+            started = time.perf_counter()
+            response = call()
+            latencies.append((time.perf_counter() - started) * 1000)
+        queries.append(len(captured.captured_queries))
+        status_codes.add(response.status_code)
+
+    tracemalloc.start()
+    try:
+        call()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    latencies.sort()
+    return {
+        "name": scenario[0],
+        "method": method.upper(),
+        "path": path,
+        "iterations": iterations,
+        "status_codes": sorted(status_codes),
+        "latency_ms": {
+            "min": round(latencies[0], 3),
+            "mean": round(sum(latencies) / len(latencies), 3),
+            "max": round(latencies[-1], 3),
+            **{
+                f"p{percent}": round(percentile(latencies, percent), 3)
+                for percent in PERCENTILES
+            },
+        },
+        "queries": {"min": min(queries), "max": max(queries)},
+        "peak_memory_kb": round(peak / 1024, 1),
+    }
+
+
+def run_size(pools, shops, iterations, warmup=2, cached=False, only=None):
+    """
+    Seed one data size for a throwaway user, run the scenarios against it
+    and roll every write back, so sizes do not leak into each other or
+    into the database.
+    """
+    scenarios = [scenario for scenario in SCENARIOS if not only or scenario[0] in only]
+    creates = [scenario[1:3] for scenario in scenarios].count(("post", "pool-list"))
+
+    with transaction.atomic():
+        started = time.perf_counter()
+        user = create_user()
+        client = APIClient()
+        client.credentials(HTTP_AUTHORIZATION=f"Bearer {AccessToken.for_user(user)}")
+        ids = seed(user, pools, shops)
+        # Every created pool claims a cabinet; make sure enough are free.
+        provision_cabinets(
+            settings.POOL_CABINET_COUNT + creates * (iterations + warmup + 1)
+        )
+        seconds = time.perf_counter() - started
+        results = [
+            measure(client, scenario, ids, iterations, warmup, cached)
+            for scenario in scenarios
+        ]
+        transaction.set_rollback(True)
+    bump_data_version()
+
+    return {
+        "pools": pools,
+        "shops": shops,
+        "seed_seconds": round(seconds, 2),
+        "scenarios": results,
+    }
+
+
+def run_render(pools, shops, iterations, warmup=2):
+    """
+    Serialize one page of ``pools`` pools as the pool list does and time
+    rendering it with DRF's ``JSONRenderer`` and ``FastJSONRenderer``.
+    Serialization is outside the timed section; the seeded rows are
+    rolled back.
+    """
+    with transaction.atomic():
+        user = create_user()
+        seed(user, pools, shops)
+        queryset = (
+            Pool.objects.filter(user=user)
+            .prefetch_related("shop_items")
+            .order_by("-created_at")
+        )
+        page = {
+            "count": pools,
+            "next": None,
+            "previous": None,
+            "results": PoolSerializer(queryset, many=True).data,
+        }
+        transaction.set_rollback(True)
+    bump_data_version()
+
+    results = []
+    contents = {}
+    for name, renderer_class in RENDERERS:
+        renderer = renderer_class()
+        for _ in range(warmup):
+            renderer.render(page)
+        latencies = []
+        for _ in range(iterations):
+            started = time.perf_counter()
+            content = renderer.render(page)
+            latencies.append((time.perf_counter() - started) * 1000)
+        latencies.sort()
+        contents[name] = content
+        results.append(
+            {
+                "renderer": name,
+                "iterations": iterations,
+                "bytes": len(content),
+                "latency_ms": {
+                    "min": round(latencies[0], 3),
+                    "mean": round(sum(latencies) / len(latencies), 3),
+                    **{
+                        f"p{percent}": round(percentile(latencies, percent), 3)
+                        for percent in PERCENTILES
+                    },
+                },
+            }
+        )
+
+    baseline = results[0]["latency_ms"]["p50"]
+    for row in results:
+        row["speedup"] = round(baseline / row["latency_ms"]["p50"], 2)
+    documents = [json.loads(content) for content in contents.values()]
+    return {
+        "pools": pools,
+        "shops": shops,
+        "identical": len(set(contents.values())) == 1,
+        "equivalent": all(document == documents[0] for document in documents),
+        "renderers": results,
+    }
@@ -0,0 +1,129 @@
+from django.db import connections, router, transaction
+from django.db.models import OuterRef, Subquery
+from django.utils import timezone
+
+from .exceptions import CabinetUnavailable
+from .models import Cabinet, Pool
+
+def provision_cabinets(count):
+    """Make sure cabinets ``1..count`` exist."""
+    Cabinet.objects.bulk_create(
+        [Cabinet(number=number) for number in range(1, count + 1)],
+        ignore_conflicts=True,
+    )
+
+
+def claim_held_cabinets():
+    """
+    Let open pools that hold no cabinet claim the free one their
+    ``cabinet_number`` names (the lowest pk wins on duplicates), so pools
+    checked in before the cabinets existed keep theirs.
+    """
+    holders = (
+        Pool.objects.filter(
+            is_calculated=False,
+            cabinet__isnull=True,
+            cabinet_number=OuterRef("number"),
+        )
+        .order_by("pk")
+        .values("pk")[:1]
+    )
+    return Cabinet.objects.filter(pool__isnull=True).update(pool=Subquery(holders))
+
+
+def seat_open_pools():
+    """
+    Give every open pool without a cabinet the one its ``cabinet_number``
+    names when that is free, or else the lowest free one. Returns how many
+    open pools are left without a cabinet.
+    """
+    claim_held_cabinets()
+    unseated = Pool.objects.filter(is_calculated=False, cabinet__isnull=True)
+    for pool in unseated.order_by("pk"):
+        try:
+            allocate_cabinet(pool)
+        except CabinetUnavailable:
+            break
+    return unseated.count()
+
+
+def allocate_cabinet(pool, number=None):
+    """
+    Give ``pool`` cabinet ``number``, or the lowest free one, and return the
+    number. The claim is a single conditional UPDATE, so two concurrent
+    check-ins can never get the same cabinet; the loser retries until no
+    free cabinet is left.
+    """
+    with transaction.atomic():
+        current = Cabinet.objects.filter(pool=pool)
+        held = current.values_list("number", flat=True).first()
+        if held is not None and number in (None, held):
+            return _assign(pool, held)
+        current.update(pool=None)
+
+        free = Cabinet.objects.filter(pool__isnull=True)
+        if number is not None:
+            free = free.filter(number=number)
+
+        while (candidate := _lowest_free(free)) is not None:
+            claimed = Cabinet.objects.filter(number=candidate, pool__isnull=True)
+            if claimed.update(pool=pool):
+                return _assign(pool, candidate)
+
+        # Raised inside the block so releasing the old cabinet rolls back.
+        if number is not None:
+            raise CabinetUnavailable(f"Cabinet {number} is not free.")
+        raise CabinetUnavailable()
+
+
+def _lowest_free(free):
+    # Where the database can skip locked rows, concurrent check-ins each
+    # lock a different cabinet instead of racing for the same one.
+    db = router.db_for_write(Cabinet)
+    if connections[db].features.has_select_for_update_skip_locked:
+        free = free.using(db).select_for_update(skip_locked=True)
+    return free.order_by("number").values_list("number", flat=True).first()
+
+
+def reclaim_cabinet(pool):
+    """
+    Give a (re)opened ``pool`` that holds no cabinet its previous number
+    when that one is free, or else the lowest free one.
+    """
+    held = Cabinet.objects.filter(pool=pool).values_list("number", flat=True)
+    held = held.first()
+    if held is not None:
+        return _assign(pool, held)
+    try:
+        return allocate_cabinet(pool, pool.cabinet_number)
+    except CabinetUnavailable:
+        return allocate_cabinet(pool)
+
+
+def _assign(pool, number):
+    if pool.cabinet_number != number:
+        # Bump updated_at so the ETags and list caches see the move.
+        now = timezone.now()
+        Pool.objects.filter(pk=pool.pk).update(cabinet_number=number, updated_at=now)
+        pool.cabinet_number = number
+        pool.updated_at = now
+    return number
+
+
+def release_cabinets(pools):
+    """Free the cabinets held by ``pools`` (a queryset or ids)."""
+    return Cabinet.objects.filter(pool__in=pools).update(pool=None)
+
+
+def occupancy():
+    free, occupied = [], {}
+    for number, pool_id in Cabinet.objects.values_list("number", "pool"):
+        if pool_id is None:
+            free.append(number)
+        else:
+            occupied[number] = pool_id
+    return {
+        "next_free": free[0] if free else None,
+        "free": free,
+        "occupied": occupied,
+    }
@@ -0,0 +1,92 @@
+import hashlib
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.utils.cache import get_conditional_response
+from django.utils.http import parse_http_date_safe
+from rest_framework.response import Response
+
+from apps.common.routers import reading_from_replica
+
+VERSION_KEY = "pool:data-version"
+HITS_KEY = "pool:list-cache:hits"
+MISSES_KEY = "pool:list-cache:misses"
+CACHED_HEADERS = ("ETag", "Last-Modified", "Cache-Control")
+
+
+def _incr(key):
+    try:
+        return cache.incr(key)
+    except ValueError:
+        cache.add(key, 0, None)
+        return cache.incr(key)
+
+
+def data_version():
+    return cache.get_or_set(VERSION_KEY, 1, None)
+
+
+def bump_data_version():
+    return _incr(VERSION_KEY)
+
+
+def invalidate_pool_cache():
+    """
+    Orphan every cached pool/shop list. The version is bumped again on
+    commit so pages cached while the transaction was open are dropped too.
+    """
+    bump_data_version()
+    transaction.on_commit(bump_data_version)
+
+
+def cache_stats():
+    hits = cache.get(HITS_KEY, 0)
+    misses = cache.get(MISSES_KEY, 0)
+    return {"hits": hits, "misses": misses, "version": data_version()}
+
+
+def list_cache_key(scope, user_id, full_path):
+    path = hashlib.md5(full_path.encode(), usedforsecurity=False).hexdigest()
+    return f"pool:list:{scope}:v{data_version()}:u{user_id}:{path}"
+
+
+class CachedListMixin:
+    """
+    Serve repeated ``list`` requests from the cache. Keys include the user,
+    the query string (filters and page) and a data version bumped on every
+    Pool/Shop write, so stale pages are never read back. Pages read from
+    the replica are served but not stored.
+    """
+
+    def list(self, request, *args, **kwargs):
+        key = list_cache_key(self.basename, request.user.pk, request.get_full_path())
+        cached = cache.get(key)
+        if cached is not None:
+            _incr(HITS_KEY)
+            data, headers = cached
+            response = get_conditional_response(
+                request,
+                etag=headers.get("ETag"),
+                last_modified=parse_http_date_safe(headers.get("Last-Modified", "")),
+            )
+            if response is None:
+                response = Response(data)
+            for name, value in headers.items():
+                response[name] = value
+            response["X-Cache"] = "HIT"
+            return response
+
+        _incr(MISSES_KEY)
+        # A page read from a lagging replica would outlive the lag under
+        # the current data version; only pages from the primary are kept.
+        from_replica = reading_from_replica()
+        response = super().list(request, *args, **kwargs)
+        if response.status_code == 200 and not from_replica:
+            headers = {
+                name: response[name] for name in CACHED_HEADERS if name in response
+            }
+            timeout = settings.POOL_LIST_CACHE_TIMEOUT
+            cache.set(key, (response.data, headers), timeout)
+        response["X-Cache"] = "MISS"
+        return response
@@ -0,0 +1,72 @@
+import hashlib
+
+from django.db.models import Count, Max
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date
+from rest_framework.response import Response
+
+
+def watermark(queryset):
+    """Latest ``updated_at`` and row count of ``queryset`` in one query."""
+    stats = queryset.order_by().aggregate(latest=Max("updated_at"), count=Count("pk"))
+    return stats["latest"], stats["count"]
+
+
+def make_etag(*parts):
+    raw = "|".join(str(part) for part in parts)
+    return '"%s"' % hashlib.md5(raw.encode(), usedforsecurity=False).hexdigest()
+
+
+def not_modified(request, etag, last_modified=None):
+    """
+    Return a 304 response when the request's validators match, else None.
+    """
+    timestamp = int(last_modified.timestamp()) if last_modified else None
+    return get_conditional_response(request, etag=etag, last_modified=timestamp)
+
+
+def set_validators(response, etag, last_modified=None):
+    response["ETag"] = etag
+    if last_modified is not None:
+        response["Last-Modified"] = http_date(last_modified.timestamp())
+    # Let browsers keep the body but revalidate it on every use.
+    response["Cache-Control"] = "private, no-cache"
+    return response
+
+
+class ConditionalGetMixin:
+    """
+    ETag validators for ``list`` and ``retrieve``. Lists hash the
+    ``updated_at`` watermark and row count of the rows they would return,
+    so a matching request costs one aggregate query and no serialization;
+    they send no Last-Modified, since the latest ``updated_at`` does not
+    move when a row leaves the set. Detail responses also carry
+    Last-Modified from the object's ``updated_at``.
+    """
+
+    def list(self, request, *args, **kwargs):
+        queryset = self.filter_queryset(self.get_queryset())
+        latest, count = watermark(queryset)
+        etag = make_etag(self.basename, request.get_full_path(), latest, count)
+        render = super().list
+        return self.conditional_response(
+            request, etag, None, lambda: render(request, *args, **kwargs)
+        )
+
+    def retrieve(self, request, *args, **kwargs):
+        instance = self.get_object()
+        etag = make_etag(self.basename, request.get_full_path(), instance.updated_at)
+        return self.conditional_response(
+            request,
+            etag,
+            instance.updated_at,
+            lambda: Response(self.get_serializer(instance).data),
+        )
+
+    def conditional_response(self, request, etag, last_modified, render):
+        response = not_modified(request, etag, last_modified)
+        if response is None:
+            response = render()
+            if response.status_code != 200:
+                return response
+        return set_validators(response, etag, last_modified)
@@ -0,0 +1,159 @@
+import random
+from contextlib import contextmanager
+from datetime import timedelta
+from decimal import Decimal
+
+from django.db import connection, transaction
+
+from .models import ZERO, Pool, PoolRental, Shop, ShopLineItem, rent_total, shop_total
+
+RENT_ITEMS = ["towel", "locker", "swimsuit", "goggles", "cap"]
+TOOLS = ["towel", "slippers", "cap", "goggles"]
+
+
+def item_catalog(size):
+    """
+    Item names with Zipf-like weights, so a few items dominate sales the
+    way they do at a real counter.
+    """
+    names = [f"item_{index}" for index in range(size)]
+    weights = [1 / (rank + 1) for rank in range(size)]
+    return names, weights
+
+
+def chunk_plan(pools, shops, batch_size):
+    """
+    Split the run into chunks of ``batch_size`` pools, each with its share
+    of the shops. Yields ``(index, pool_count, shop_count)``.
+    """
+    index = start = 0
+    while start < pools:
+        end = min(start + batch_size, pools)
+        yield index, end - start, shops * end // pools - shops * start // pools
+        index += 1
+        start = end
+
+
+@contextmanager
+def explicit_timestamps(*models):
+    """Let bulk_create keep the created_at/updated_at values it is given."""
+    fields = [
+        field
+        for model in models
+        for field in model._meta.concrete_fields
+        if getattr(field, "auto_now", False) or getattr(field, "auto_now_add", False)
+    ]
+    saved = [(field, field.auto_now, field.auto_now_add) for field in fields]
+    for field in fields:
+        field.auto_now = field.auto_now_add = False
+    try:
+        yield
+    finally:
+        for field, auto_now, auto_now_add in saved:
+            field.auto_now, field.auto_now_add = auto_now, auto_now_add
+
+
+def _money(rng, low, high):
+    return Decimal(rng.uniform(low, high)).quantize(Decimal("0.01"))
+
+
+def generate_chunk(
+    index, pool_count, shop_count, user_ids, seed, now, days, max_items, catalog_size
+):
+    """
+    Build one chunk of pools and shops in memory, with every total already
+    computed, and write it with bulk_create in one transaction.
+    """
+    rng = random.Random(f"{seed}:{index}")
+    names, weights = item_catalog(catalog_size)
+    today = now.date()
+
+    pools = []
+    for number in range(pool_count):
+        created = now - timedelta(seconds=rng.uniform(0, days * 86400))
+        rent = {}
+        if rng.random() < 0.3:
+            for item in rng.sample(RENT_ITEMS, rng.randint(1, 2)):
+                rent[item] = str(_money(rng, 5, 50))
+        total_pay = _money(rng, 1000, 10000)
+        pools.append(
+            Pool(
+                user_id=rng.choice(user_ids),
+                name=f"Pool Test {index}-{number + 1}",
+                num_people=rng.randint(1, 100),
+                cabinet_number=rng.randint(1, 50),
+                total_pay=total_pay,
+                rent=rent,
+                tools=rng.sample(TOOLS, rng.randint(0, 2)),
+                is_calculated=created.date() < today,
+                rent_total=rent_total(rent),
+                created_at=created,
+                updated_at=created,
+            )
+        )
+
+    shops = []
+    owners = []
+    shop_totals = [ZERO] * pool_count
+    for _ in range(shop_count):
+        owner = rng.randrange(pool_count)
+        pool = pools[owner]
+        picked = rng.choices(names, weights, k=rng.randint(1, max_items))
+        items = {name: str(_money(rng, 1, 100)) for name in picked}
+        total = shop_total(items)
+        created = min(pool.created_at + timedelta(minutes=rng.randint(1, 180)), now)
+        shop_totals[owner] += total
+        owners.append(owner)
+        shops.append(
+            Shop(
+                user_id=rng.choice(user_ids),
+                list=items,
+                total=total,
+                is_calculated=pool.is_calculated,
+                created_at=created,
+                updated_at=created,
+            )
+        )
+
+    for pool, total in zip(pools, shop_totals):
+        pool.shop_total = total
+        pool.grand_total = pool.total_pay + total + pool.rent_total
+
+    with explicit_timestamps(Pool, Shop), transaction.atomic():
+        Pool.objects.bulk_create(pools)
+        for shop, owner in zip(shops, owners):
+            shop.pool_customer_id = pools[owner].pk
+        Shop.objects.bulk_create(shops)
+        ShopLineItem.objects.bulk_create(
+            [
+                ShopLineItem(shop_id=shop.pk, name=name, amount=Decimal(amount))
+                for shop in shops
+                for name, amount in shop.list.items()
+            ],
+            batch_size=5000,
+        )
+        PoolRental.objects.bulk_create(
+            [
+                PoolRental(pool_id=pool.pk, item=item, amount=Decimal(amount))
+                for pool in pools
+                for item, amount in pool.rent.items()
+            ],
+            batch_size=5000,
+        )
+    return pool_count, shop_count
+
+
+def init_worker():
+    """
+    Pool initializer for forked workers. SQLite's default deferred
+    transactions fail with "database is locked" instead of waiting when
+    two writers race to upgrade their lock, so take the write lock up
+    front and let ``timeout`` queue the workers.
+    """
+    connection.ensure_connection()
+    if connection.vendor == "sqlite":
+        connection.transaction_mode = "IMMEDIATE"
+
+
+def run_chunk(task):
+    return generate_chunk(**task)
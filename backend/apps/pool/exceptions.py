@@ -0,0 +1,7 @@
+from rest_framework.exceptions import APIException
+
+
+class CabinetUnavailable(APIException):
+    status_code = 409
+    default_detail = "No free cabinet is available."
+    default_code = "cabinet_unavailable"
@@ -0,0 +1,103 @@
+import csv
+import json
+
+from django.core.serializers.json import DjangoJSONEncoder
+from django.http import StreamingHttpResponse
+
+EXPORT_FORMATS = ("csv", "ndjson")
+EXPORT_CHUNK_SIZE = 2000
+
+POOL_EXPORT_FIELDS = [
+    "id",
+    "user",
+    "name",
+    "num_people",
+    "cabinet_number",
+    "total_pay",
+    "shop_total",
+    "rent_total",
+    "grand_total",
+    "rent",
+    "tools",
+    "is_calculated",
+    "created_at",
+    "updated_at",
+]
+
+SHOP_EXPORT_FIELDS = [
+    "id",
+    "user",
+    "pool_customer",
+    "list",
+    "total",
+    "is_calculated",
+    "created_at",
+    "updated_at",
+]
+
+CONTENT_TYPES = {
+    "csv": "text/csv; charset=utf-8",
+    "ndjson": "application/x-ndjson; charset=utf-8",
+}
+
+
+class Echo:
+    """File-like object whose write() hands the line back to the caller."""
+
+    def write(self, value):
+        return value
+
+
+def _csv_value(value):
+    if isinstance(value, (dict, list)):
+        return json.dumps(value, cls=DjangoJSONEncoder)
+    return value
+
+
+def csv_lines(rows, fields):
+    writer = csv.writer(Echo())
+    yield writer.writerow(fields)
+    for row in rows:
+        yield writer.writerow([_csv_value(row[field]) for field in fields])
+
+
+def ndjson_lines(rows, fields):
+    for row in rows:
+        yield json.dumps(row, cls=DjangoJSONEncoder) + "\n"
+
+
+def _batched(lines, size):
+    # Group lines so the server writes a few large chunks instead of one
+    # tiny chunk per row.
+    batch = []
+    for line in lines:
+        batch.append(line)
+        if len(batch) >= size:
+            yield "".join(batch)
+            batch = []
+    if batch:
+        yield "".join(batch)
+
+
+def export_response(queryset, fields, export_format, filename):
+    """
+    Stream ``queryset`` as CSV or NDJSON, reading ``values()`` rows in
+    chunks so memory use does not grow with the number of rows.
+    """
+    # Pick the database now: the rows are read while the response streams,
+    # after the view (and its replica routing) has returned.
+    rows = (
+        queryset.using(queryset.db)
+        .prefetch_related(None)
+        .values(*fields)
+        .iterator(chunk_size=EXPORT_CHUNK_SIZE)
+    )
+    lines = csv_lines if export_format == "csv" else ndjson_lines
+    response = StreamingHttpResponse(
+        _batched(lines(rows, fields), 500),
+        content_type=CONTENT_TYPES[export_format],
+    )
+    response["Content-Disposition"] = (
+        f'attachment; filename="{filename}.{export_format}"'
+    )
+    return response
@@ -0,0 +1,63 @@
+from django.db import NotSupportedError, models
+
+from .models import AMOUNT_PATTERN, CENTS
+
+# Values are summed in whole cents so SQLite's REAL arithmetic cannot drift.
+# Text values must match AMOUNT_PATTERN, through the REGEXP function Django
+# registers on SQLite connections.
+SQLITE_TEMPLATE = (
+    "(SELECT ROUND(COALESCE("
+    "SUM(CAST(ROUND(CAST(value AS REAL) * 100) AS INTEGER)), 0) / 100.0, 2)"
+    " FROM json_each(%(expressions)s)"
+    " WHERE json_type(%(expressions)s) = 'object'"
+    " AND (type IN ('integer', 'real')"
+    f" OR (type = 'text' AND value REGEXP '{AMOUNT_PATTERN}')))"
+)
+# jsonb_each_text renders booleans as 'true'/'false', which the pattern
+# rejects.
+POSTGRESQL_TEMPLATE = (
+    "(SELECT ROUND(COALESCE(SUM(value::numeric), 0), 2) FROM jsonb_each_text("
+    "CASE WHEN jsonb_typeof(%(expressions)s) = 'object'"
+    " THEN %(expressions)s ELSE '{}'::jsonb END)"
+    f" WHERE value ~ '{AMOUNT_PATTERN}')"
+)
+
+
+class JSONValuesSum(models.Func):
+    """
+    Sum of the numeric values of a JSON object column, computed by the
+    database. Matches ``rent_total`` for amounts in whole cents: only the
+    values ``parse_amount`` accepts are summed (booleans and malformed
+    strings are skipped) and anything but an object sums to zero.
+
+        Pool.objects.annotate(rent_sum=JSONValuesSum("rent"))
+    """
+
+    output_field = models.DecimalField(max_digits=12, decimal_places=2)
+
+    def as_sql(self, compiler, connection, **extra_context):
+        raise NotSupportedError(
+            f"JSONValuesSum is not implemented for {connection.vendor}."
+        )
+
+    def _as_sql(self, compiler, connection, template, **extra_context):
+        sql, params = super().as_sql(
+            compiler, connection, template=template, **extra_context
+        )
+        # Both templates reference the column twice.
+        return sql, (*params, *params)
+
+    def as_sqlite(self, compiler, connection, **extra_context):
+        return self._as_sql(compiler, connection, SQLITE_TEMPLATE, **extra_context)
+
+    def as_postgresql(self, compiler, connection, **extra_context):
+        return self._as_sql(
+            compiler, connection, POSTGRESQL_TEMPLATE, **extra_context
+        )
+
+    def get_db_converters(self, connection):
+        return [*super().get_db_converters(connection), self.convert_cents]
+
+    def convert_cents(self, value, expression, connection):
+        # SQLite hands back a REAL, e.g. 1.20000000000000.
+        return None if value is None else value.quantize(CENTS)
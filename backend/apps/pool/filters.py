@@ -1,16 +1,67 @@
 import django_filters
 
 from .models import Pool, Shop
+from .reports import date_range
 
+RANGE = ["exact", "gte", "lte"]
+TIME_RANGE = ["exact", "gte", "gt", "lte", "lt"]
 
-class PoolFilter(django_filters.FilterSet):
+# ``?ordering=`` fields of the pool list (sync and async).
+POOL_ORDERING_FIELDS = [
+    "created_at",
+    "total_pay",
+    "shop_total",
+    "rent_total",
+    "grand_total",
+]
+
+
+class CreatedRangeFilterSet(django_filters.FilterSet):
+    """
+    ``created_from``/``created_to`` take inclusive dates and turn them into
+    ``created_at`` bounds, so the lookup stays an index range scan.
+    """
+
+    created_from = django_filters.DateFilter(method="filter_created_from")
+    created_to = django_filters.DateFilter(method="filter_created_to")
+
+    def filter_created_from(self, queryset, name, value):
+        lower, _ = date_range(value, value)
+        return queryset.filter(created_at__gte=lower)
+
+    def filter_created_to(self, queryset, name, value):
+        _, upper = date_range(value, value)
+        return queryset.filter(created_at__lt=upper)
+
+
+class PoolFilter(CreatedRangeFilterSet):
     class Meta:
         model = Pool
-
-        exclude = ["rent", "tools"]
+        fields = {
+            "id": ["exact"],
+            "user": ["exact"],
+            "name": ["exact"],
+            "num_people": ["exact"],
+            "cabinet_number": ["exact"],
+            "total_pay": RANGE,
+            "is_calculated": ["exact"],
+            "shop_total": RANGE,
+            "rent_total": RANGE,
+            "grand_total": RANGE,
+            "created_at": TIME_RANGE,
+            "updated_at": TIME_RANGE,
+        }
 
 
-class ShopFilter(django_filters.FilterSet):
+class ShopFilter(CreatedRangeFilterSet):
     class Meta:
         model = Shop
-        exclude = ["list"]
+        fields = {
+            "id": ["exact"],
+            "user": ["exact"],
+            "pool_customer": ["exact"],
+            "total": RANGE,
+            "is_calculated": ["exact"],
+            "created_at": TIME_RANGE,
+            "updated_at": TIME_RANGE,
+        }
@@ -0,0 +1,35 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from apps.pool.models import Shop, ShopLineItem
+
+
+class Command(BaseCommand):
+    help = "Rebuild ShopLineItem rows from Shop.list for every shop"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=1000)
+
+    def handle(self, *args, **options):
+        batch_size = options["batch_size"]
+        shops = (
+            Shop.objects.order_by("pk")
+            .only("pk", "list")
+            .iterator(chunk_size=batch_size)
+        )
+
+        count = 0
+        batch = []
+        for shop in shops:
+            batch.append(shop)
+            if len(batch) >= batch_size:
+                count += self.write(batch)
+                batch = []
+        if batch:
+            count += self.write(batch)
+
+        self.stdout.write(self.style.SUCCESS(f"Wrote {count} shop line items."))
+
+    def write(self, shops):
+        with transaction.atomic():
+            return len(ShopLineItem.replace_for(shops))
@@ -0,0 +1,89 @@
+import json
+import platform
+import time
+
+import django
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+
+from apps.pool.benchmarks import SCENARIOS, client_environment, run_size
+
+
+class Command(BaseCommand):
+    help = (
+        "Benchmark the pool and shop API at several data sizes and report "
+        "latency percentiles, queries per request and peak memory"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--sizes",
+            type=int,
+            nargs="+",
+            default=[1000, 10000],
+            help="Pool counts to seed; each gets --shops-per-pool shops per pool.",
+        )
+        parser.add_argument("--shops-per-pool", type=float, default=2)
+        parser.add_argument("--iterations", type=int, default=30)
+        parser.add_argument("--warmup", type=int, default=2)
+        parser.add_argument(
+            "--scenario",
+            action="append",
+            choices=[scenario[0] for scenario in SCENARIOS],
+            help="Only run these scenarios (repeatable).",
+        )
+        parser.add_argument(
+            "--cached",
+            action="store_true",
+            help="Let list requests hit the response cache.",
+        )
+        parser.add_argument("--label", default="", help="Stored with the results.")
+        parser.add_argument("--output", help="Write the JSON results to this file.")
+
+    def handle(self, *args, **options):
+        if options["iterations"] < 1 or any(size < 1 for size in options["sizes"]):
+            raise CommandError("--sizes and --iterations must be positive.")
+
+        results = {
+            "label": options["label"],
+            "started_at": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+            "python": platform.python_version(),
+            "django": django.get_version(),
+            "database": connection.vendor,
+            "cached": options["cached"],
+            "sizes": [],
+        }
+        with client_environment():
+            for pools in options["sizes"]:
+                shops = int(pools * options["shops_per_pool"])
+                self.stdout.write(f"Seeding {pools} pools and {shops} shops...")
+                size = run_size(
+                    pools,
+                    shops,
+                    options["iterations"],
+                    options["warmup"],
+                    options["cached"],
+                    options["scenario"],
+                )
+                results["sizes"].append(size)
+                self.write_table(size)
+
+        if options["output"]:
+            with open(options["output"], "w") as handle:
+                json.dump(results, handle, indent=2)
+            self.stdout.write(self.style.SUCCESS(f"Wrote {options['output']}"))
+        else:
+            self.stdout.write(json.dumps(results, indent=2))
+
+    def write_table(self, size):
+        self.stdout.write(
+            f"{'scenario':<18} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} "
+            f"{'queries':>8} {'peak KB':>9}"
+        )
+        for row in size["scenarios"]:
+            latency = row["latency_ms"]
+            self.stdout.write(
+                f"{row['name']:<18} {latency['p50']:>9} {latency['p95']:>9} "
+                f"{latency['p99']:>9} {row['queries']['max']:>8} "
+                f"{row['peak_memory_kb']:>9}"
+            )
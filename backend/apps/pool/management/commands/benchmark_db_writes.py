@@ -0,0 +1,118 @@
+import json
+import threading
+import time
+from decimal import Decimal
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db import OperationalError, connection, connections, transaction
+
+from apps.common.db import sqlite_pragmas
+from apps.pool.benchmarks import percentile
+from apps.pool.models import Pool, Shop
+
+User = get_user_model()
+
+NAME_PREFIX = "db-write-benchmark"
+
+
+class Command(BaseCommand):
+    help = (
+        "Measure write throughput with concurrent writers (check in a pool "
+        "and sell a shop per transaction). Run it once per database profile "
+        "(SQLite, DATABASE_URL) to compare them"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--workers", type=int, default=8)
+        parser.add_argument(
+            "--transactions", type=int, default=50, help="Per worker."
+        )
+        parser.add_argument("--output", help="Write the JSON results to this file.")
+        parser.add_argument(
+            "--keep", action="store_true", help="Keep the rows written."
+        )
+
+    def handle(self, *args, **options):
+        user = User.objects.order_by("pk").first()
+        if user is None:
+            raise CommandError("No users found. Please create some users first.")
+
+        latencies = []
+        errors = []
+        lock = threading.Lock()
+
+        def work(worker):
+            try:
+                for number in range(options["transactions"]):
+                    started = time.perf_counter()
+                    try:
+                        self.write(user, worker, number)
+                    except OperationalError as error:
+                        with lock:
+                            errors.append(str(error))
+                        continue
+                    with lock:
+                        latencies.append((time.perf_counter() - started) * 1000)
+            finally:
+                connections.close_all()
+
+        threads = [
+            threading.Thread(target=work, args=(worker,))
+            for worker in range(options["workers"])
+        ]
+        started = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        seconds = time.perf_counter() - started
+
+        latencies.sort()
+        results = {
+            "vendor": connection.vendor,
+            "pragmas": sqlite_pragmas(connection)
+            if connection.vendor == "sqlite"
+            else {},
+            "conn_max_age": connection.settings_dict["CONN_MAX_AGE"],
+            "workers": options["workers"],
+            "transactions": len(latencies),
+            "errors": len(errors),
+            "first_error": errors[0] if errors else None,
+            "seconds": round(seconds, 3),
+            "per_second": round(len(latencies) / seconds, 1),
+            "latency_ms": {
+                f"p{percent}": round(percentile(latencies, percent) or 0, 3)
+                for percent in (50, 95, 99)
+            },
+        }
+        if not options["keep"]:
+            self.cleanup()
+
+        output = json.dumps(results, indent=2)
+        if options["output"]:
+            with open(options["output"], "w") as handle:
+                handle.write(output)
+        self.stdout.write(output)
+
+    def write(self, user, worker, number):
+        # The same writes as a check-in plus a sale through the API,
+        # including the signal-maintained totals and rollups.
+        with transaction.atomic():
+            pool = Pool.objects.create(
+                user=user,
+                name=f"{NAME_PREFIX} {worker}-{number}",
+                num_people=2,
+                cabinet_number=0,
+                total_pay=Decimal("10.00"),
+                is_calculated=True,
+            )
+            Shop.objects.create(user=user, pool_customer=pool, list={"water": "2.50"})
+
+    def cleanup(self):
+        pools = Pool.objects.filter(name__startswith=NAME_PREFIX)
+        with transaction.atomic():
+            for shop in Shop.objects.filter(pool_customer__in=pools):
+                shop.delete()
+            for pool in pools:
+                pool.delete()
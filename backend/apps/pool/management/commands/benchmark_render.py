@@ -0,0 +1,50 @@
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+
+from apps.common import renderers
+from apps.pool.benchmarks import run_render
+
+
+class Command(BaseCommand):
+    help = (
+        "Time rendering one pool list page (page_size=--pools) as JSON with "
+        "DRF's JSONRenderer and with FastJSONRenderer"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--pools", type=int, default=10000)
+        parser.add_argument("--shops-per-pool", type=float, default=2)
+        parser.add_argument("--iterations", type=int, default=20)
+        parser.add_argument("--warmup", type=int, default=2)
+        parser.add_argument("--output", help="Write the JSON results to this file.")
+
+    def handle(self, *args, **options):
+        if options["iterations"] < 1 or options["pools"] < 1:
+            raise CommandError("--pools and --iterations must be positive.")
+        if renderers.orjson is None:
+            self.stderr.write(
+                "orjson is not installed: FastJSONRenderer falls back to the "
+                "stdlib encoder."
+            )
+
+        shops = int(options["pools"] * options["shops_per_pool"])
+        self.stdout.write(f"Seeding {options['pools']} pools and {shops} shops...")
+        results = run_render(
+            options["pools"], shops, options["iterations"], options["warmup"]
+        )
+        for row in results["renderers"]:
+            latency = row["latency_ms"]
+            self.stdout.write(
+                f"{row['renderer']:<6} p50 {latency['p50']:>9} ms  "
+                f"p95 {latency['p95']:>9} ms  {row['bytes']:>10} bytes  "
+                f"x{row['speedup']}"
+            )
+
+        output = json.dumps(results, indent=2)
+        if options["output"]:
+            with open(options["output"], "w") as handle:
+                handle.write(output)
+            self.stdout.write(self.style.SUCCESS(f"Wrote {options['output']}"))
+        else:
+            self.stdout.write(output)
@@ -1,56 +1,114 @@
-import random
-from decimal import Decimal
+import multiprocessing
+import time
+from datetime import timedelta
 
-from django.core.management.base import BaseCommand
 from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+from django.utils import timezone
 
-from apps.pool.models import Pool, Shop
-
+from apps.pool.cabinets import seat_open_pools
+from apps.pool.cache import invalidate_pool_cache
+from apps.pool.datagen import chunk_plan, init_worker, run_chunk
+from apps.pool.rollups import daily_ranges, rebuild_daily_revenue
 
 User = get_user_model()
 
 
 class Command(BaseCommand):
-    help = "Generate 500 test data entries for Pool and Shop models"
+    help = "Generate Pool and Shop test data in bulk, optionally across processes"
 
-    def handle(self, *args, **kwargs):
-        users = list(User.objects.all())
-        if not users:
-            self.stdout.write(self.style.ERROR("No users found. Please create some users first."))
-            return
+    def add_arguments(self, parser):
+        parser.add_argument("--pools", type=int, default=500)
+        parser.add_argument("--shops", type=int, default=500)
+        parser.add_argument("--seed", type=int, default=0)
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=1000,
+            help="Pools (with their shops) written per transaction.",
+        )
+        parser.add_argument(
+            "--days",
+            type=int,
+            default=30,
+            help="Spread created_at over this many days before now.",
+        )
+        parser.add_argument("--max-items", type=int, default=5)
+        parser.add_argument(
+            "--catalog-size",
+            type=int,
+            default=50,
+            help="Number of distinct item names, drawn with Zipf-like weights.",
+        )
+        parser.add_argument("--workers", type=int, default=1)
 
-        # Create 500 Pool instances
-        pools = []
-        for i in range(500):
-            user = random.choice(users)
-            pool = Pool(
-                user=user,
-                name=f"Pool Test {i+1}",
-                num_people=random.randint(1, 100),
-                cabinet_number=random.randint(1, 50),
-                total_pay=Decimal(random.uniform(1000, 10000)).quantize(Decimal("0.01")),
+    def handle(self, *args, **options):
+        user_ids = list(User.objects.values_list("pk", flat=True))
+        if not user_ids:
+            self.stdout.write(
+                self.style.ERROR("No users found. Please create some users first.")
             )
-            pools.append(pool)
-        Pool.objects.bulk_create(pools)
-        self.stdout.write(self.style.SUCCESS("Created 500 Pool entries."))
-
-        # Refresh pools list after bulk_create
-        pools = list(Pool.objects.all())
-
-        # Create 500 Shop instances
-        for i in range(500):
-            user = random.choice(users)
-            pool_customer = random.choice(pools)
-            items = {
-                f"item_{j}": str(Decimal(random.uniform(1, 100)).quantize(Decimal("0.01")))
-                for j in range(random.randint(1, 5))
+            return
+        positive = ["pools", "batch_size", "days", "max_items", "catalog_size"]
+        if any(options[name] < 1 for name in positive):
+            raise CommandError(
+                "--pools, --batch-size, --days, --max-items and --catalog-size "
+                "must be positive."
+            )
+
+        now = timezone.now()
+        tasks = [
+            {
+                "index": index,
+                "pool_count": pool_count,
+                "shop_count": shop_count,
+                "user_ids": user_ids,
+                "seed": options["seed"],
+                "now": now,
+                "days": options["days"],
+                "max_items": options["max_items"],
+                "catalog_size": options["catalog_size"],
             }
-            shop = Shop(
-                user=user,
-                pool_customer=pool_customer,
-                list=items,
+            for index, pool_count, shop_count in chunk_plan(
+                options["pools"], options["shops"], options["batch_size"]
+            )
+        ]
+
+        started = time.perf_counter()
+        if options["workers"] > 1:
+            # Workers are forked; they must open their own connections.
+            connections.close_all()
+            context = multiprocessing.get_context("fork")
+            with context.Pool(options["workers"], init_worker) as workers:
+                results = workers.imap_unordered(run_chunk, tasks)
+                pools, shops = self.report_progress(results, len(tasks))
+        else:
+            pools, shops = self.report_progress(map(run_chunk, tasks), len(tasks))
+
+        # Chunks draw cabinet numbers independently; open pools then claim
+        # real, distinct cabinets.
+        unseated = seat_open_pools()
+        first_day = (now - timedelta(days=options["days"])).date()
+        for start, end in daily_ranges(first_day, now.date(), 31):
+            rebuild_daily_revenue(start, end)
+        invalidate_pool_cache()
+
+        elapsed = time.perf_counter() - started
+        if unseated:
+            self.stdout.write(
+                self.style.WARNING(f"{unseated} open pools found no free cabinet.")
+            )
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Created {pools} Pool and {shops} Shop entries in {elapsed:.1f}s."
             )
-            # Save each Shop to calculate total in save()
-            shop.save()
+        )
 
-        self.stdout.write(self.style.SUCCESS("Created 500 Shop entries."))
+    def report_progress(self, results, chunks):
+        pools = shops = 0
+        for done, (pool_count, shop_count) in enumerate(results, start=1):
+            pools += pool_count
+            shops += shop_count
+            self.stdout.write(f"  chunk {done}/{chunks}: {pools} pools, {shops} shops")
+        return pools, shops
@@ -0,0 +1,50 @@
+from datetime import date
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db.models import Max, Min
+
+from apps.pool.models import DailyRevenue, Pool, Shop
+from apps.pool.rollups import daily_ranges, local_day, rebuild_daily_revenue
+
+
+class Command(BaseCommand):
+    help = "Backfill or rebuild the DailyRevenue rollup from pools and shops"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--start", type=date.fromisoformat, help="YYYY-MM-DD")
+        parser.add_argument("--end", type=date.fromisoformat, help="YYYY-MM-DD")
+        parser.add_argument(
+            "--chunk-days",
+            type=int,
+            default=31,
+            help="Number of days aggregated per transaction.",
+        )
+
+    def handle(self, *args, **options):
+        bounds = [
+            model.objects.aggregate(first=Min("created_at"), last=Max("created_at"))
+            for model in (Pool, Shop)
+        ]
+        firsts = [local_day(item["first"]) for item in bounds if item["first"]]
+        lasts = [local_day(item["last"]) for item in bounds if item["last"]]
+        # Cover existing rollup rows too, so days without activity are dropped.
+        days = DailyRevenue.objects.aggregate(first=Min("day"), last=Max("day"))
+        firsts += [days["first"]] if days["first"] else []
+        lasts += [days["last"]] if days["last"] else []
+        start = options["start"] or (min(firsts) if firsts else None)
+        end = options["end"] or (max(lasts) if lasts else None)
+        if start is None or end is None:
+            self.stdout.write("Nothing to roll up.")
+            return
+        if start > end:
+            raise CommandError("--start must be on or before --end.")
+
+        rows = 0
+        for chunk_start, chunk_end in daily_ranges(start, end, options["chunk_days"]):
+            rows += rebuild_daily_revenue(chunk_start, chunk_end)
+
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Rebuilt {rows} daily revenue rows from {start} to {end}."
+            )
+        )
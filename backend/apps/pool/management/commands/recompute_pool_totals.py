@@ -0,0 +1,129 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import F, Sum
+from django.utils import timezone
+
+from apps.pool.cache import invalidate_pool_cache
+from apps.pool.expressions import JSONValuesSum
+from apps.pool.models import ZERO, Pool, PoolRental, Shop
+from apps.pool.rollups import local_day, rebuild_buckets, touched_buckets
+
+TOTAL_FIELDS = ["shop_total", "rent_total", "grand_total"]
+
+
+class Command(BaseCommand):
+    help = "Reconcile the stored shop/rent/grand totals on Pool in batches"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=1000)
+        parser.add_argument(
+            "--dry-run",
+            action="store_true",
+            help="Only report how many pools have drifted.",
+        )
+        parser.add_argument(
+            "--rentals",
+            action="store_true",
+            help="Also rebuild the PoolRental rows from Pool.rent.",
+        )
+        parser.add_argument(
+            "--shops",
+            action="store_true",
+            help="First recompute Shop.total from Shop.list in the database.",
+        )
+
+    def handle(self, *args, **options):
+        batch_size = options["batch_size"]
+        if options["shops"]:
+            self.recompute_shops(options["dry_run"])
+
+        checked = drifted = 0
+        last_pk = 0
+        # The rent JSON is summed by the database; only load it to rebuild
+        # the rentals.
+        fields = [*TOTAL_FIELDS, "total_pay", "user", "created_at"]
+        if options["rentals"]:
+            fields.append("rent")
+
+        while True:
+            batch = list(
+                Pool.objects.filter(pk__gt=last_pk)
+                .order_by("pk")
+                .only(*fields)
+                .annotate(expected_rent=JSONValuesSum("rent"))[:batch_size]
+            )
+            if not batch:
+                break
+            last_pk = batch[-1].pk
+            checked += len(batch)
+
+            shop_totals = dict(
+                Shop.objects.filter(pool_customer__in=[pool.pk for pool in batch])
+                .order_by()
+                .values("pool_customer")
+                .annotate(total=Sum("total"))
+                .values_list("pool_customer", "total")
+            )
+
+            stale = []
+            for pool in batch:
+                expected_shop = shop_totals.get(pool.pk) or ZERO
+                expected_rent = pool.expected_rent
+                expected_grand = pool.total_pay + expected_shop + expected_rent
+                if (pool.shop_total, pool.rent_total, pool.grand_total) != (
+                    expected_shop,
+                    expected_rent,
+                    expected_grand,
+                ):
+                    pool.shop_total = expected_shop
+                    pool.rent_total = expected_rent
+                    pool.grand_total = expected_grand
+                    stale.append(pool)
+
+            drifted += len(stale)
+            if options["dry_run"]:
+                continue
+            with transaction.atomic():
+                if stale:
+                    # Bump updated_at so ETags and cached pages see the fix.
+                    now = timezone.now()
+                    for pool in stale:
+                        pool.updated_at = now
+                    Pool.objects.bulk_update(stale, [*TOTAL_FIELDS, "updated_at"])
+                    rebuild_buckets(
+                        {(local_day(pool.created_at), pool.user_id) for pool in stale}
+                    )
+                if options["rentals"]:
+                    PoolRental.replace_for(batch)
+
+        if drifted and not options["dry_run"]:
+            invalidate_pool_cache()
+
+        verb = "Found" if options["dry_run"] else "Fixed"
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Checked {checked} pools. {verb} {drifted} with drifted totals."
+            )
+        )
+
+    def recompute_shops(self, dry_run):
+        """
+        Fix ``Shop.total`` with one UPDATE, without loading any shop, then
+        rebuild the rollup days it touched. The pools' totals are fixed by
+        the reconciliation that follows.
+        """
+        stale = Shop.objects.alias(expected=JSONValuesSum("list")).exclude(
+            total=F("expected")
+        )
+        if dry_run:
+            count = stale.count()
+        else:
+            with transaction.atomic():
+                buckets = touched_buckets(stale)
+                count = stale.update(
+                    total=JSONValuesSum("list"), updated_at=timezone.now()
+                )
+                rebuild_buckets(buckets)
+                invalidate_pool_cache()
+        verb = "Found" if dry_run else "Fixed"
+        self.stdout.write(f"{verb} {count} shops with a drifted total.")
@@ -1,11 +1,121 @@
 # Create your models here.
+import math
+import re
 from decimal import Decimal
 
 from django.contrib.auth import get_user_model
-from django.db import models
+from django.db import connections, models, router, transaction
+from django.db.models import F, OuterRef, Subquery, Sum, Value
+from django.db.models.functions import Coalesce, Now
 
 User = get_user_model()
 
+ZERO = Decimal("0.00")
+CENTS = Decimal("0.01")
+
+# A plain decimal string, optionally with an exponent and surrounding
+# whitespace. Written for both Python and PostgreSQL regular expressions,
+# so JSONValuesSum accepts exactly the values parse_amount does.
+AMOUNT_PATTERN = (
+    r"^[ \t\n\r\f\v]*[-+]?([0-9]+\.?[0-9]*|\.[0-9]+)([eE][-+]?[0-9]+)?"
+    r"[ \t\n\r\f\v]*$"
+)
+_AMOUNT = re.compile(AMOUNT_PATTERN)
+
+
+def parse_amount(value):
+    """
+    ``value`` as a ``Decimal`` if it is a finite JSON number (not a
+    boolean) or a string matching ``AMOUNT_PATTERN``, else ``None``.
+    """
+    if isinstance(value, bool):
+        return None
+    if isinstance(value, (int, float)):
+        return Decimal(value) if math.isfinite(value) else None
+    if isinstance(value, str) and _AMOUNT.match(value):
+        return Decimal(value)
+    return None
+
+
+def sum_amounts(values, skip_invalid=False):
+    """
+    Sum an iterable of numeric strings/numbers as ``Decimal``.
+
+    With ``skip_invalid`` values ``parse_amount`` rejects are ignored
+    instead of raising.
+    """
+    total = ZERO
+    for value in values:
+        amount = parse_amount(value)
+        if amount is None:
+            if skip_invalid:
+                continue
+            raise ValueError(f"{value!r} is not an amount.")
+        total += amount
+    return total.quantize(CENTS)
+
+
+def shop_total(items):
+    """
+    Total of a ``Shop.list`` mapping of item name to price. The API only
+    accepts valid prices; legacy ones are skipped, as JSONValuesSum does.
+    """
+    if not items:
+        return ZERO
+    return sum_amounts(items.values(), skip_invalid=True)
+
+
+def rent_total(rent):
+    if not isinstance(rent, dict):
+        return ZERO
+    return sum_amounts(rent.values(), skip_invalid=True)
+
+
+def rollup_values(instance):
+    """
+    The values of ``instance`` its DailyRevenue bucket is built from, or
+    ``None`` if some of them were deferred.
+    """
+    values = instance.__dict__
+    if any(field not in values for field in instance.ROLLUP_SOURCE_FIELDS):
+        return None
+    return tuple(values[field] for field in instance.ROLLUP_SOURCE_FIELDS)
+
+
+class PoolQuerySet(models.QuerySet):
+    def refresh_totals(self):
+        """
+        Recompute the stored shop and grand totals from ``Shop.total`` in a
+        single UPDATE. ``updated_at`` is bumped too, since pools embed their
+        shops in the API.
+
+        Where the database supports it the pool rows are locked first, so
+        the UPDATE (a new statement under READ COMMITTED) sees the shops
+        of every concurrent writer that held them before; otherwise two
+        check-ins could each write a sum missing the other's shop.
+        """
+        shop_sum = Coalesce(
+            Subquery(
+                Shop.objects.filter(pool_customer=OuterRef("pk"))
+                .order_by()
+                .values("pool_customer")
+                .annotate(total=Sum("total"))
+                .values("total")
+            ),
+            Value(ZERO),
+            output_field=models.DecimalField(max_digits=12, decimal_places=2),
+        )
+        db = self._db or router.db_for_write(self.model)
+        with transaction.atomic(using=db):
+            if connections[db].features.has_select_for_update:
+                locked = self.using(db).select_for_update().order_by("pk")
+                list(locked.values_list("pk", flat=True))
+            return self.using(db).update(
+                shop_total=shop_sum,
+                grand_total=F("total_pay") + F("rent_total") + shop_sum,
+                updated_at=Now(),
+            )
+
 
 class Pool(models.Model):
     user = models.ForeignKey(User, on_delete=models.PROTECT)
@@ -16,12 +126,78 @@ class Pool(models.Model):
     rent = models.JSONField(default=dict)
     tools = models.JSONField(default=list)
     is_calculated = models.BooleanField(default=False)
+    shop_total = models.DecimalField(max_digits=12, decimal_places=2, default=ZERO)
+    rent_total = models.DecimalField(max_digits=12, decimal_places=2, default=ZERO)
+    grand_total = models.DecimalField(
+        max_digits=12, decimal_places=2, default=ZERO, db_index=True
+    )
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    objects = PoolQuerySet.as_manager()
+
+    ROLLUP_SOURCE_FIELDS = (
+        "created_at",
+        "user_id",
+        "num_people",
+        "total_pay",
+        "rent_total",
+    )
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["-created_at", "-id"], name="pool_created_id_idx"),
+            models.Index(
+                fields=["is_calculated", "-created_at"], name="pool_open_created_idx"
+            ),
+            models.Index(
+                fields=["user", "is_calculated", "-created_at"],
+                name="pool_user_open_created_idx",
+            ),
+            models.Index(fields=["user", "-created_at"], name="pool_user_created_idx"),
+            models.Index(
+                fields=["is_calculated", "updated_at"], name="pool_open_updated_idx"
+            ),
+            models.Index(fields=["updated_at"], name="pool_updated_idx"),
+        ]
+
     def __str__(self):
         return f"{self.name} - with  {self.num_people} number of people"
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # What this row counts in its DailyRevenue bucket, so saving or
+        # deleting it applies only the difference.
+        instance._loaded_rollup = rollup_values(instance)
+        return instance
+
+    def save(self, *args, **kwargs):
+        adding = self._state.adding
+        self.rent_total = rent_total(self.rent)
+        self.grand_total = (
+            Decimal(self.total_pay) + Decimal(self.shop_total) + self.rent_total
+        ).quantize(CENTS)
+
+        update_fields = kwargs.get("update_fields")
+        if update_fields is not None:
+            kwargs["update_fields"] = {*update_fields, "rent_total", "grand_total"}
+
+        # post_save handlers maintain derived tables; keep them in the same
+        # transaction as the row.
+        with transaction.atomic():
+            super().save(*args, **kwargs)
+
+            if not adding:
+                # shop_total is maintained by the Shop signals, so the copy
+                # held by this instance may be stale; recompute it.
+                Pool.objects.filter(pk=self.pk).refresh_totals()
+                self.refresh_from_db(fields=["shop_total", "grand_total"])
+
+    def delete(self, *args, **kwargs):
+        with transaction.atomic():
+            return super().delete(*args, **kwargs)
+
 
 class Shop(models.Model):
     user = models.ForeignKey(User, on_delete=models.PROTECT)
@@ -36,15 +212,153 @@ class Shop(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    ROLLUP_SOURCE_FIELDS = ("created_at", "user_id", "total")
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["-created_at", "-id"], name="shop_created_id_idx"),
+            models.Index(
+                fields=["is_calculated", "-created_at"], name="shop_open_created_idx"
+            ),
+            models.Index(fields=["user", "-created_at"], name="shop_user_created_idx"),
+            models.Index(fields=["total"], name="shop_total_idx"),
+            models.Index(fields=["updated_at"], name="shop_updated_idx"),
+        ]
+
     def __str__(self):
         return f"{self.user.first_name}"
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Remember the pool this row was loaded with so moving a shop to
+        # another pool can refresh both pools' totals.
+        instance._loaded_pool_customer_id = instance.__dict__.get("pool_customer_id")
+        instance._loaded_rollup = rollup_values(instance)
+        return instance
+
     def save(self, *args, **kwargs):
+        self.total = shop_total(self.list)
+
+        # The post_save handler refreshes the pool totals; keep both writes
+        # in one transaction.
+        with transaction.atomic():
+            super().save(*args, **kwargs)
+
+    def delete(self, *args, **kwargs):
+        with transaction.atomic():
+            return super().delete(*args, **kwargs)
 
-        if self.list:
-            self.total = sum(Decimal(value) for value in self.list.values())
 
-        else:
-            self.total = Decimal("0.00")
+class ShopLineItem(models.Model):
+    """One ``name: price`` entry of ``Shop.list``, kept in sync on save."""
+
+    shop = models.ForeignKey(Shop, on_delete=models.CASCADE, related_name="line_items")
+    name = models.CharField(max_length=255)
+    amount = models.DecimalField(max_digits=12, decimal_places=2)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["name", "shop"], name="shop_line_item_name_idx"),
+        ]
+
+    def __str__(self):
+        return f"{self.name}: {self.amount}"
+
+    @classmethod
+    def replace_for(cls, shops):
+        """
+        Rebuild the line items of ``shops`` from their ``list`` field,
+        skipping the legacy prices ``shop_total`` skips.
+        """
+        shops = [shop for shop in shops if shop.pk is not None]
+        cls.objects.filter(shop__in=[shop.pk for shop in shops]).delete()
+        items = []
+        for shop in shops:
+            for name, amount in (shop.list or {}).items():
+                amount = parse_amount(amount)
+                if amount is not None:
+                    items.append(cls(shop_id=shop.pk, name=name, amount=amount))
+        return cls.objects.bulk_create(items, batch_size=1000)
+
+
+class PoolRental(models.Model):
+    """One ``item: amount`` entry of ``Pool.rent``, kept in sync on save."""
+
+    pool = models.ForeignKey(Pool, on_delete=models.CASCADE, related_name="rentals")
+    item = models.CharField(max_length=255)
+    amount = models.DecimalField(max_digits=12, decimal_places=2)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["item", "pool"], name="pool_rental_item_idx"),
+        ]
+
+    def __str__(self):
+        return f"{self.item}: {self.amount}"
 
-        super().save(*args, **kwargs)
+    @classmethod
+    def replace_for(cls, pools):
+        """
+        Rebuild the rentals of ``pools`` from their ``rent`` field. Legacy
+        non-numeric values are skipped, as they are in ``rent_total``.
+        """
+        pools = [pool for pool in pools if pool.pk is not None]
+        cls.objects.filter(pool__in=[pool.pk for pool in pools]).delete()
+        rentals = []
+        for pool in pools:
+            if not isinstance(pool.rent, dict):
+                continue
+            for item, amount in pool.rent.items():
+                amount = parse_amount(amount)
+                if amount is None:
+                    continue
+                rentals.append(cls(pool_id=pool.pk, item=item[:255], amount=amount))
+        return cls.objects.bulk_create(rentals, batch_size=1000)
+
+
+class Cabinet(models.Model):
+    """A physical cabinet, held by at most one open pool at a time."""
+
+    number = models.PositiveSmallIntegerField(unique=True)
+    pool = models.OneToOneField(
+        Pool,
+        null=True,
+        blank=True,
+        on_delete=models.SET_NULL,
+        related_name="cabinet",
+    )
+
+    class Meta:
+        ordering = ["number"]
+        indexes = [
+            models.Index(fields=["pool", "number"], name="cabinet_free_idx"),
+        ]
+
+    def __str__(self):
+        return f"Cabinet {self.number}"
+
+
+class DailyRevenue(models.Model):
+    """Per day and user rollup of pool, shop and rent revenue."""
+
+    day = models.DateField()
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name="+")
+    pool_count = models.PositiveIntegerField(default=0)
+    people_count = models.PositiveBigIntegerField(default=0)
+    shop_count = models.PositiveIntegerField(default=0)
+    pool_revenue = models.DecimalField(max_digits=14, decimal_places=2, default=ZERO)
+    shop_revenue = models.DecimalField(max_digits=14, decimal_places=2, default=ZERO)
+    rent_revenue = models.DecimalField(max_digits=14, decimal_places=2, default=ZERO)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        ordering = ["day"]
+        constraints = [
+            models.UniqueConstraint(
+                fields=["day", "user"], name="daily_revenue_day_user"
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.day} - {self.user_id}"
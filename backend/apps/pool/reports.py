@@ -0,0 +1,62 @@
+from datetime import datetime, time, timedelta
+
+from django.db.models import DateField, Sum
+from django.db.models.functions import Trunc
+from django.utils import timezone
+
+from .models import DailyRevenue
+
+GRANULARITIES = ("day", "week", "month")
+
+
+def truncate_period(granularity, field="created_at"):
+    return Trunc(field, granularity, output_field=DateField())
+
+
+def date_range(start, end):
+    tz = timezone.get_current_timezone()
+    return (
+        timezone.make_aware(datetime.combine(start, time.min), tz),
+        timezone.make_aware(datetime.combine(end + timedelta(days=1), time.min), tz),
+    )
+
+
+def financial_report_rows(start, end, granularity="day", user=None):
+    """
+    Pool payments, shop sales and rent grouped by ``granularity`` between
+    ``start`` and ``end`` (inclusive dates), as a lazy values queryset.
+    Reads the DailyRevenue rollup, so a month costs at most 31 rows per
+    user.
+    """
+    days = DailyRevenue.objects.filter(day__gte=start, day__lte=end)
+    if user is not None:
+        days = days.filter(user=user)
+
+    return (
+        days.annotate(period=truncate_period(granularity, "day"))
+        .order_by("period")
+        .values("period")
+        .annotate(
+            pool_count=Sum("pool_count"),
+            num_people=Sum("people_count"),
+            pool_total=Sum("pool_revenue"),
+            shop_count=Sum("shop_count"),
+            shop_total=Sum("shop_revenue"),
+            rent_total=Sum("rent_revenue"),
+        )
+    )
+
+
+def _with_grand_total(row):
+    row["grand_total"] = row["pool_total"] + row["shop_total"] + row["rent_total"]
+    return row
+
+
+def build_financial_report(start, end, granularity="day", user=None):
+    rows = financial_report_rows(start, end, granularity, user)
+    return [_with_grand_total(row) for row in rows]
+
+
+async def abuild_financial_report(start, end, granularity="day", user=None):
+    rows = financial_report_rows(start, end, granularity, user)
+    return [_with_grand_total(row) async for row in rows.aiterator()]
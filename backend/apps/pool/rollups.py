@@ -0,0 +1,184 @@
+from collections import defaultdict
+from datetime import timedelta
+from decimal import Decimal
+
+from django.db import transaction
+from django.db.models import Count, F, Sum
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+
+from .models import ZERO, DailyRevenue, Pool, Shop, rollup_values
+from .reports import date_range
+
+ROLLUP_FIELDS = [
+    "pool_count",
+    "people_count",
+    "shop_count",
+    "pool_revenue",
+    "shop_revenue",
+    "rent_revenue",
+]
+
+
+def local_day(value):
+    return timezone.localtime(value).date()
+
+
+def rebuild_daily_revenue(start, end, users=None):
+    """
+    Recompute the DailyRevenue rows between ``start`` and ``end``
+    (inclusive dates), optionally only for ``users`` (ids), from two
+    grouped aggregates. Days without activity lose their row.
+    """
+    lower, upper = date_range(start, end)
+    pools = Pool.objects.filter(created_at__gte=lower, created_at__lt=upper)
+    shops = Shop.objects.filter(created_at__gte=lower, created_at__lt=upper)
+    rows = DailyRevenue.objects.filter(day__gte=start, day__lte=end)
+    if users is not None:
+        pools = pools.filter(user__in=users)
+        shops = shops.filter(user__in=users)
+        rows = rows.filter(user__in=users)
+
+    buckets = {}
+
+    def bucket(day, user_id):
+        return buckets.setdefault(
+            (day, user_id), DailyRevenue(day=day, user_id=user_id)
+        )
+
+    pool_rows = (
+        pools.annotate(day=TruncDate("created_at"))
+        .order_by()
+        .values("day", "user")
+        .annotate(
+            pool_count=Count("id"),
+            people_count=Sum("num_people"),
+            pool_revenue=Sum("total_pay"),
+            rent_revenue=Sum("rent_total"),
+        )
+    )
+    for item in pool_rows:
+        row = bucket(item["day"], item["user"])
+        row.pool_count = item["pool_count"]
+        row.people_count = item["people_count"] or 0
+        row.pool_revenue = item["pool_revenue"] or ZERO
+        row.rent_revenue = item["rent_revenue"] or ZERO
+
+    shop_rows = (
+        shops.annotate(day=TruncDate("created_at"))
+        .order_by()
+        .values("day", "user")
+        .annotate(shop_count=Count("id"), shop_revenue=Sum("total"))
+    )
+    for item in shop_rows:
+        row = bucket(item["day"], item["user"])
+        row.shop_count = item["shop_count"]
+        row.shop_revenue = item["shop_revenue"] or ZERO
+
+    with transaction.atomic():
+        stale = [
+            pk
+            for pk, day, user_id in rows.values_list("pk", "day", "user")
+            if (day, user_id) not in buckets
+        ]
+        DailyRevenue.objects.filter(pk__in=stale).delete()
+        DailyRevenue.objects.bulk_create(
+            buckets.values(),
+            update_conflicts=True,
+            unique_fields=["day", "user"],
+            update_fields=[*ROLLUP_FIELDS, "updated_at"],
+            batch_size=500,
+        )
+    return len(buckets)
+
+
+def _contribution(model, values):
+    """The bucket and amounts one pool or shop adds to the rollup."""
+    if model is Pool:
+        created_at, user_id, num_people, total_pay, rent_total = values
+        amounts = {
+            "pool_count": 1,
+            "people_count": num_people,
+            "pool_revenue": Decimal(total_pay),
+            "rent_revenue": Decimal(rent_total),
+        }
+    else:
+        created_at, user_id, total = values
+        amounts = {"shop_count": 1, "shop_revenue": Decimal(total)}
+    return (local_day(created_at), user_id), amounts
+
+
+def refresh_daily_revenue(instances, deleted=False):
+    """
+    Apply what pool or shop ``instances`` changed in their rollup buckets
+    since they were loaded (all of it for new rows, minus all of it when
+    ``deleted``) as F() increments, so concurrent writers to one bucket
+    never overwrite each other. Instances loaded with deferred fields
+    rebuild their bucket instead.
+    """
+    deltas = defaultdict(lambda: defaultdict(int))
+    rebuild = set()
+    for instance in instances:
+        if instance.created_at is None:
+            continue
+        loaded = getattr(instance, "_loaded_rollup", ())
+        current = None if deleted else rollup_values(instance)
+        if loaded is None or (current is None and not deleted):
+            rebuild.add((local_day(instance.created_at), instance.user_id))
+            continue
+        for values, sign in ((loaded, -1), (current, 1)):
+            if values:
+                bucket, amounts = _contribution(type(instance), values)
+                for field, amount in amounts.items():
+                    deltas[bucket][field] += sign * amount
+        instance._loaded_rollup = current or ()
+
+    for (day, user_id), amounts in deltas.items():
+        amounts = {field: amount for field, amount in amounts.items() if amount}
+        if amounts:
+            _apply_delta(day, user_id, amounts)
+    rebuild_buckets(rebuild)
+
+
+def _apply_delta(day, user_id, amounts):
+    rows = DailyRevenue.objects.filter(day=day, user_id=user_id)
+    changes = {field: F(field) + amount for field, amount in amounts.items()}
+    changes["updated_at"] = timezone.now()
+    with transaction.atomic():
+        if not rows.update(**changes):
+            # First activity of the bucket: insert an empty row (another
+            # writer may win the race) and increment it like any other.
+            DailyRevenue.objects.bulk_create(
+                [DailyRevenue(day=day, user_id=user_id)], ignore_conflicts=True
+            )
+            rows.update(**changes)
+        if amounts.get("pool_count", 0) < 0 or amounts.get("shop_count", 0) < 0:
+            # Days without activity have no row, as after a rebuild.
+            rows.filter(pool_count=0, shop_count=0).delete()
+
+
+def touched_buckets(queryset):
+    """The (local day, user id) buckets of a pool or shop ``queryset``."""
+    return set(
+        queryset.annotate(day=TruncDate("created_at"))
+        .order_by()
+        .values_list("day", "user")
+        .distinct()
+    )
+
+
+def rebuild_buckets(buckets):
+    """Rebuild the given (day, user id) rollup buckets."""
+    by_day = {}
+    for day, user_id in buckets:
+        by_day.setdefault(day, set()).add(user_id)
+    for day, users in by_day.items():
+        rebuild_daily_revenue(day, day, users)
+
+
+def daily_ranges(start, end, days):
+    """Split ``start..end`` into consecutive ranges of at most ``days`` days."""
+    while start <= end:
+        stop = min(start + timedelta(days=days - 1), end)
+        yield start, stop
+        start = stop + timedelta(days=1)
@@ -0,0 +1,109 @@
+import re
+
+from django.db import connections
+from django.db.models.expressions import RawSQL
+from rest_framework.filters import BaseFilterBackend
+
+from .models import Pool
+
+FTS_TABLE = "pool_pool_fts"
+
+
+def install_pool_search(using="default"):
+    """
+    Create the FTS5 index over ``Pool.name`` and the triggers that keep it
+    in sync, then rebuild it. Safe to run repeatedly; only SQLite is
+    supported.
+    """
+    connection = connections[using]
+    if connection.vendor != "sqlite":
+        return False
+
+    table = Pool._meta.db_table
+    statements = [
+        f"""
+        CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} USING fts5(
+            name,
+            content='{table}',
+            content_rowid='id',
+            tokenize='unicode61 remove_diacritics 2',
+            prefix='2 3'
+        )
+        """,
+        f"""
+        CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_ai AFTER INSERT ON {table} BEGIN
+            INSERT INTO {FTS_TABLE}(rowid, name) VALUES (new.id, new.name);
+        END
+        """,
+        f"""
+        CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_ad AFTER DELETE ON {table} BEGIN
+            INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, name)
+            VALUES ('delete', old.id, old.name);
+        END
+        """,
+        f"""
+        CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_au AFTER UPDATE OF name ON {table}
+        BEGIN
+            INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, name)
+            VALUES ('delete', old.id, old.name);
+            INSERT INTO {FTS_TABLE}(rowid, name) VALUES (new.id, new.name);
+        END
+        """,
+        # Table rebuilds by migrations drop the triggers, so always resync.
+        f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('rebuild')",
+    ]
+    with connection.cursor() as cursor:
+        for statement in statements:
+            cursor.execute(statement)
+    return True
+
+
+def fts_query(term):
+    """Turn free text into an FTS5 query matching every word as a prefix."""
+    words = re.findall(r"\w+", term)
+    return " ".join(f'"{word}"*' for word in words)
+
+
+def search_pools(queryset, term, pool_field="pk"):
+    """
+    Filter ``queryset`` to rows whose pool name matches ``term`` and order
+    them by FTS5 rank. ``pool_field`` points from the queryset's model to
+    the pool id.
+    """
+    match = fts_query(term)
+    if not match:
+        return queryset.none()
+
+    if connections[queryset.db].vendor != "sqlite":
+        lookup = "name" if pool_field == "pk" else f"{pool_field}__name"
+        for word in re.findall(r"\w+", term):
+            queryset = queryset.filter(**{f"{lookup}__icontains": word})
+        return queryset
+
+    meta = queryset.model._meta
+    field = meta.pk if pool_field == "pk" else meta.get_field(pool_field)
+    matches = RawSQL(
+        f"SELECT rowid FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s", [match]
+    )
+    rank = RawSQL(
+        f"SELECT rank FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s "
+        f'AND rowid = "{meta.db_table}"."{field.column}"',
+        [match],
+    )
+    return (
+        queryset.filter(**{f"{pool_field}__in": matches})
+        .annotate(search_rank=rank)
+        .order_by("search_rank", "-created_at")
+    )
+
+
+class PoolNameSearchFilter(BaseFilterBackend):
+    """``?search=`` on pool names; views set ``search_pool_field`` for shops."""
+
+    search_param = "search"
+
+    def filter_queryset(self, request, queryset, view):
+        term = request.query_params.get(self.search_param, "").strip()
+        if not term:
+            return queryset
+        return search_pools(queryset, term, getattr(view, "search_pool_field", "pk"))
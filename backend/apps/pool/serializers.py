@@ -1,8 +1,31 @@
-from decimal import Decimal, InvalidOperation
 
+from django.db import transaction
+from django.utils import timezone
 from rest_framework import serializers
 
-from .models import Pool, Shop
+from .cache import invalidate_pool_cache
+from .models import Pool, Shop, ShopLineItem, parse_amount, shop_total
+from .reports import GRANULARITIES, date_range
+from .rollups import refresh_daily_revenue
+
+BULK_MAX_SHOPS = 1000
+
+
+def validate_amounts(value):
+    """
+    Check a JSON object of ``name: price`` where every price is an amount
+    ``parse_amount`` accepts, so the stored totals never skip an entry.
+    """
+    if not isinstance(value, dict):
+        raise serializers.ValidationError("Expected an object of item: price.")
+    for name, price in value.items():
+        if len(name) > 255:
+            raise serializers.ValidationError(
+                f"Item name {name[:20]!r}... is too long."
+            )
+        if parse_amount(price) is None:
+            raise serializers.ValidationError(f"Price of {name!r} is not a number.")
+    return value
 
 
 class ShopSerializer(serializers.ModelSerializer):
@@ -12,11 +35,89 @@ class ShopSerializer(serializers.ModelSerializer):
         model = Shop
         fields = ["id", "pool_customer", "list", "is_calculated", "total", "created_at"]
 
+    def validate_list(self, value):
+        return validate_amounts(value)
+
+
+class ShopBulkListSerializer(serializers.ListSerializer):
+    def validate(self, attrs):
+        if len(attrs) > BULK_MAX_SHOPS:
+            raise serializers.ValidationError(
+                f"At most {BULK_MAX_SHOPS} shops can be written per request."
+            )
+
+        pool_ids = {item["pool_customer"] for item in attrs}
+        missing_pools = pool_ids - set(
+            Pool.objects.filter(pk__in=pool_ids).values_list("pk", flat=True)
+        )
+        if missing_pools:
+            raise serializers.ValidationError(
+                f"Unknown pool_customer ids: {sorted(missing_pools)}."
+            )
+
+        shop_ids = {item["id"] for item in attrs if "id" in item}
+        self.instances = Shop.objects.in_bulk(shop_ids)
+        missing_shops = shop_ids - set(self.instances)
+        if missing_shops:
+            raise serializers.ValidationError(
+                f"Unknown shop ids: {sorted(missing_shops)}."
+            )
+        return attrs
+
+    def save(self, **kwargs):
+        """
+        Insert new shops and update existing ones with one bulk_create and
+        one bulk_update, then refresh the affected pools' totals.
+        """
+        now = timezone.now()
+        created, updated = [], []
+        pool_ids = set()
+        # Updates only write the fields some item sent (and the totals).
+        update_fields = {"total", "updated_at"}
+
+        for item in self.validated_data:
+            item = dict(item)
+            item["pool_customer_id"] = item.pop("pool_customer")
+            pool_ids.add(item["pool_customer_id"])
+
+            if "id" in item:
+                shop = self.instances[item.pop("id")]
+                pool_ids.add(shop.pool_customer_id)
+                for attr, value in item.items():
+                    setattr(shop, attr, value)
+                shop.total = shop_total(shop.list)
+                shop.updated_at = now
+                update_fields.update(item)
+                updated.append(shop)
+            else:
+                item["total"] = shop_total(item.get("list"))
+                created.append(Shop(**item, **kwargs))
+
+        with transaction.atomic():
+            created = Shop.objects.bulk_create(created, batch_size=500)
+            if updated:
+                Shop.objects.bulk_update(updated, update_fields, batch_size=500)
+            Pool.objects.filter(pk__in=pool_ids).refresh_totals()
+            ShopLineItem.replace_for(created + updated)
+            refresh_daily_revenue(created + updated)
+            invalidate_pool_cache()
+
+        self.instance = created + updated
+        return self.instance
+
+
+class ShopBulkSerializer(ShopSerializer):
+    id = serializers.IntegerField(required=False)
+    pool_customer = serializers.IntegerField()
+
+    class Meta(ShopSerializer.Meta):
+        list_serializer_class = ShopBulkListSerializer
+
 
 class PoolSerializer(serializers.ModelSerializer):
     shop_items = ShopSerializer(many=True, read_only=True)
-    total_shop = serializers.SerializerMethodField()
-    totals = serializers.SerializerMethodField()
+    total_shop = serializers.CharField(source="shop_total", read_only=True)
+    totals = serializers.CharField(source="grand_total", read_only=True)
     tools = serializers.ListField(child=serializers.CharField())
 
     class Meta:
@@ -32,28 +133,99 @@ class PoolSerializer(serializers.ModelSerializer):
             "tools",
             "shop_items",
             "total_shop",
+            "rent_total",
             "totals",
             "created_at",
         ]
+        read_only_fields = ["rent_total"]
+        # Left out, the lowest free cabinet is allocated on create.
+        extra_kwargs = {"cabinet_number": {"required": False}}
+
+    def validate_rent(self, value):
+        return validate_amounts(value)
+
+
+class PoolChoiceSerializer(serializers.Serializer):
+    id = serializers.IntegerField()
+    name = serializers.CharField()
+    cabinet_number = serializers.IntegerField()
+
+
+class CabinetRequestSerializer(serializers.Serializer):
+    number = serializers.IntegerField(required=False, min_value=1)
+
+
+class ItemSalesSerializer(serializers.Serializer):
+    name = serializers.CharField()
+    quantity = serializers.IntegerField()
+    total = serializers.DecimalField(max_digits=14, decimal_places=2)
+
+
+class RentalSalesSerializer(serializers.Serializer):
+    period = serializers.DateField(required=False)
+    item = serializers.CharField()
+    quantity = serializers.IntegerField()
+    total = serializers.DecimalField(max_digits=14, decimal_places=2)
+
+
+class ReportQuerySerializer(serializers.Serializer):
+    start = serializers.DateField()
+    end = serializers.DateField()
+    granularity = serializers.ChoiceField(choices=GRANULARITIES, default="day")
+    user = serializers.IntegerField(required=False)
+
+    def validate(self, attrs):
+        if attrs["start"] > attrs["end"]:
+            raise serializers.ValidationError("start must be on or before end.")
+        return attrs
+
+
+class ReportRowSerializer(serializers.Serializer):
+    period = serializers.DateField()
+    pool_count = serializers.IntegerField()
+    num_people = serializers.IntegerField()
+    pool_total = serializers.DecimalField(max_digits=14, decimal_places=2)
+    shop_count = serializers.IntegerField()
+    shop_total = serializers.DecimalField(max_digits=14, decimal_places=2)
+    rent_total = serializers.DecimalField(max_digits=14, decimal_places=2)
+    grand_total = serializers.DecimalField(max_digits=14, decimal_places=2)
+
+
+class RentalQuerySerializer(serializers.Serializer):
+    granularity = serializers.ChoiceField(choices=GRANULARITIES, required=False)
+
+
+class SettleSerializer(serializers.Serializer):
+    """Select pools or shops by ``ids`` or by user and creation date range."""
+
+    ids = serializers.ListField(
+        child=serializers.IntegerField(), required=False, allow_empty=False
+    )
+    user = serializers.IntegerField(required=False)
+    start = serializers.DateField(required=False)
+    end = serializers.DateField(required=False)
+    is_calculated = serializers.BooleanField(default=True)
+    cascade = serializers.BooleanField(
+        default=True, help_text="Also settle the shops of the selected pools."
+    )
+
+    def validate(self, attrs):
+        if not {"ids", "user", "start", "end"} & attrs.keys():
+            raise serializers.ValidationError("Provide ids or a user/start/end filter.")
+        if "start" in attrs and "end" in attrs and attrs["start"] > attrs["end"]:
+            raise serializers.ValidationError("start must be on or before end.")
+        return attrs
 
-    def get_total_shop(self, obj):
-        total = Decimal("0.00")
-        for item in obj.shop_items.all():
-            total += Decimal(item.total)
-        return str(total)
-
-    def get_totals(self, obj):
-        total_shop = Decimal(self.get_total_shop(obj))
-        total_pay = Decimal(obj.total_pay)
-        rent_total = Decimal("0.00")
-
-        # Safely sum all values in rent field
-        if isinstance(obj.rent, dict):
-            for value in obj.rent.values():
-                try:
-                    rent_total += Decimal(value)
-                except (TypeError, ValueError, InvalidOperation):
-                    continue  # skip if value is not numeric
-
-        grand_total = total_pay + total_shop + rent_total
-        return str(grand_total)
+    def filter_queryset(self, queryset):
+        data = self.validated_data
+        if "ids" in data:
+            queryset = queryset.filter(pk__in=data["ids"])
+        if "user" in data:
+            queryset = queryset.filter(user=data["user"])
+        if "start" in data:
+            lower, _ = date_range(data["start"], data["start"])
+            queryset = queryset.filter(created_at__gte=lower)
+        if "end" in data:
+            _, upper = date_range(data["end"], data["end"])
+            queryset = queryset.filter(created_at__lt=upper)
+        return queryset
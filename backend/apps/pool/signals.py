@@ -0,0 +1,72 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from apps.pool.cabinets import release_cabinets
+from apps.pool.cache import invalidate_pool_cache
+from apps.pool.models import Pool, PoolRental, Shop, ShopLineItem
+from apps.pool.rollups import refresh_daily_revenue
+
+
+def _shop_pool_ids(instance):
+    return {
+        pk
+        for pk in (
+            instance.pool_customer_id,
+            getattr(instance, "_loaded_pool_customer_id", None),
+        )
+        if pk is not None
+    }
+
+
+@receiver(post_save, sender=Shop)
+def refresh_pool_totals_on_shop_save(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    Pool.objects.filter(pk__in=_shop_pool_ids(instance)).refresh_totals()
+    instance._loaded_pool_customer_id = instance.pool_customer_id
+
+
+@receiver(post_save, sender=Shop)
+def sync_line_items_on_shop_save(
+    sender, instance, raw=False, update_fields=None, **kwargs
+):
+    if raw or (update_fields is not None and "list" not in update_fields):
+        return
+    ShopLineItem.replace_for([instance])
+
+
+@receiver(post_delete, sender=Shop)
+def refresh_pool_totals_on_shop_delete(sender, instance, **kwargs):
+    Pool.objects.filter(pk__in=_shop_pool_ids(instance)).refresh_totals()
+
+
+@receiver(post_save, sender=Pool)
+def sync_rentals_on_pool_save(
+    sender, instance, raw=False, update_fields=None, **kwargs
+):
+    if raw or (update_fields is not None and "rent" not in update_fields):
+        return
+    PoolRental.replace_for([instance])
+
+
+@receiver(post_save, sender=Pool)
+def release_cabinet_when_calculated(sender, instance, raw=False, **kwargs):
+    if not raw and instance.is_calculated:
+        release_cabinets([instance.pk])
+
+
+@receiver(post_save, sender=Pool)
+@receiver(post_delete, sender=Pool)
+@receiver(post_save, sender=Shop)
+@receiver(post_delete, sender=Shop)
+def refresh_rollup(sender, instance, signal, raw=False, **kwargs):
+    if not raw:
+        refresh_daily_revenue([instance], deleted=signal is post_delete)
+
+
+@receiver(post_save, sender=Pool)
+@receiver(post_delete, sender=Pool)
+@receiver(post_save, sender=Shop)
+@receiver(post_delete, sender=Shop)
+def invalidate_list_cache(sender, **kwargs):
+    invalidate_pool_cache()
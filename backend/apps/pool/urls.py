@@ -1,7 +1,13 @@
 from django.urls import include, path
 from rest_framework.routers import DefaultRouter
 
-from .views import PoolViewSet, ShopDetailAPIView, ShopViewSet
+from . import async_views
+from .views import (
+    FinancialReportAPIView,
+    PoolViewSet,
+    ShopDetailAPIView,
+    ShopViewSet,
+)
 
 router = DefaultRouter()
 router.register("pools", PoolViewSet, basename="pool")
@@ -11,4 +17,15 @@ router.register("shops", ShopViewSet, basename="shop")
 urlpatterns = [
     path("api/", include(router.urls)),
     path("shops/<int:pk>/", ShopDetailAPIView.as_view(), name="shop-detail"),
+    path("reports/", FinancialReportAPIView.as_view(), name="financial-report"),
+    # Async read path, for ASGI deployments.
+    path("async/pools/", async_views.pool_list, name="async-pool-list"),
+    path("async/pools/<int:pk>/", async_views.pool_detail, name="async-pool-detail"),
+    path("async/shops/", async_views.shop_list, name="async-shop-list"),
+    path("async/shops/<int:pk>/", async_views.shop_detail, name="async-shop-detail"),
+    path(
+        "async/reports/",
+        async_views.financial_report,
+        name="async-financial-report",
+    ),
 ]
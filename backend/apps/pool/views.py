@@ -1,45 +1,257 @@
+from django.db import transaction
+from django.db.models import Count, Sum
 from django.shortcuts import get_object_or_404, render
+from django.utils import timezone
 from django_filters.rest_framework import DjangoFilterBackend
 
 # Create your views here.
-from rest_framework import permissions, status, viewsets
+from rest_framework import filters, permissions, status, viewsets
+from rest_framework.decorators import action
 from rest_framework.response import Response
 from rest_framework.views import APIView
 
-from .filters import PoolFilter, ShopFilter
-from .models import Pool, Shop
-from .pagination import CustomerUserPagination
-from .serializers import PoolSerializer, ShopSerializer
+from apps.common.routers import ReplicaReadMixin
 
+from .cabinets import (
+    allocate_cabinet,
+    occupancy,
+    reclaim_cabinet,
+    release_cabinets,
+)
+from .cache import CachedListMixin, invalidate_pool_cache
+from .conditional import (
+    ConditionalGetMixin,
+    make_etag,
+    not_modified,
+    set_validators,
+    watermark,
+)
+from .exports import POOL_EXPORT_FIELDS, SHOP_EXPORT_FIELDS, export_response
+from .filters import POOL_ORDERING_FIELDS, PoolFilter, ShopFilter
+from .models import Pool, PoolRental, Shop, ShopLineItem
+from .pagination import PoolShopPagination
+from .reports import build_financial_report, truncate_period
+from .search import PoolNameSearchFilter
+from .serializers import (
+    CabinetRequestSerializer,
+    ItemSalesSerializer,
+    PoolChoiceSerializer,
+    PoolSerializer,
+    RentalQuerySerializer,
+    RentalSalesSerializer,
+    ReportQuerySerializer,
+    ReportRowSerializer,
+    SettleSerializer,
+    ShopBulkSerializer,
+    ShopSerializer,
+)
 
-class PoolViewSet(viewsets.ModelViewSet):
+
+class PoolViewSet(
+    ReplicaReadMixin, CachedListMixin, ConditionalGetMixin, viewsets.ModelViewSet
+):
     serializer_class = PoolSerializer
     permission_classes = [permissions.IsAuthenticated]
-    pagination_class = CustomerUserPagination
-    filter_backends = [DjangoFilterBackend]
+    pagination_class = PoolShopPagination
+    filter_backends = [
+        DjangoFilterBackend,
+        PoolNameSearchFilter,
+        filters.OrderingFilter,
+    ]
     filterset_class = PoolFilter
-    queryset = Pool.objects.all().order_by("-created_at")
+    ordering_fields = POOL_ORDERING_FIELDS
+    queryset = Pool.objects.prefetch_related("shop_items").order_by("-created_at")
+    replica_actions = {"list", "export", "choices", "rentals"}
 
+    def perform_create(self, serializer):
+        requested = serializer.validated_data.get("cabinet_number")
+        with transaction.atomic():
+            pool = serializer.save(
+                user=self.request.user, cabinet_number=requested or 0
+            )
+            if not pool.is_calculated:
+                allocate_cabinet(pool, requested)
 
-    
+    def perform_update(self, serializer):
+        requested = serializer.validated_data.get("cabinet_number")
+        with transaction.atomic():
+            pool = serializer.save()
+            if pool.is_calculated:
+                return
+            if requested is not None:
+                allocate_cabinet(pool, requested)
+            else:
+                reclaim_cabinet(pool)
 
-    def perform_create(self, serializer):
-        serializer.save(user=self.request.user)
+    @action(detail=True, methods=["post"])
+    def cabinet(self, request, pk=None):
+        """Allocate ``number`` (or the lowest free cabinet) to an open pool."""
+        pool = self.get_object()
+        params = CabinetRequestSerializer(data=request.data)
+        params.is_valid(raise_exception=True)
+        if pool.is_calculated:
+            return Response(
+                {"detail": "Calculated pools cannot hold a cabinet."},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+        number = allocate_cabinet(pool, params.validated_data.get("number"))
+        invalidate_pool_cache()
+        return Response({"pool": pool.pk, "cabinet_number": number})
+
+    @action(detail=False, methods=["get"])
+    def cabinets(self, request):
+        """Free and occupied cabinets, with the next one to hand out."""
+        return Response(occupancy())
+
+    @action(
+        detail=False,
+        methods=["get"],
+        url_path=r"export/(?P<export_format>csv|ndjson)",
+    )
+    def export(self, request, export_format=None):
+        queryset = self.filter_queryset(self.get_queryset())
+        return export_response(queryset, POOL_EXPORT_FIELDS, export_format, "pools")
 
+    @action(detail=False, methods=["get"])
+    def choices(self, request):
+        """
+        ``id``, ``name`` and ``cabinet_number`` of every open pool for
+        pickers, with an ETag so unchanged lists cost a 304.
+        """
+        pools = Pool.objects.filter(is_calculated=False)
+        latest, count = watermark(pools)
+        etag = make_etag("pool-choices", latest, count)
+        # ETag only: the latest updated_at does not move when a pool is
+        # settled and leaves the list.
+        response = not_modified(request, etag)
+        if response is None:
+            rows = pools.order_by("name", "id").values("id", "name", "cabinet_number")
+            response = Response(PoolChoiceSerializer(rows, many=True).data)
+        return set_validators(response, etag)
 
-class ShopViewSet(viewsets.ModelViewSet):
+    @action(detail=False, methods=["get"])
+    def rentals(self, request):
+        """
+        Rental count and amount per item over the filtered pools, optionally
+        split by ``granularity`` (day/week/month) of the pool's creation.
+        """
+        params = RentalQuerySerializer(data=request.query_params)
+        params.is_valid(raise_exception=True)
+        pools = self.filter_queryset(self.get_queryset()).order_by()
+        rentals = PoolRental.objects.filter(pool__in=pools.values("pk"))
+        group_by = ["item"]
+        granularity = params.validated_data.get("granularity")
+        if granularity:
+            rentals = rentals.annotate(
+                period=truncate_period(granularity, "pool__created_at")
+            )
+            group_by.insert(0, "period")
+        rows = (
+            rentals.values(*group_by)
+            .annotate(quantity=Count("id"), total=Sum("amount"))
+            .order_by(*group_by)
+        )
+        return Response(RentalSalesSerializer(rows, many=True).data)
+
+    @action(detail=False, methods=["post"])
+    def settle(self, request):
+        """
+        Set ``is_calculated`` on the selected pools (and their shops) with
+        one UPDATE per table.
+        """
+        serializer = SettleSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        pools = serializer.filter_queryset(Pool.objects.all())
+        changes = {
+            "is_calculated": serializer.validated_data["is_calculated"],
+            "updated_at": timezone.now(),
+        }
+        with transaction.atomic():
+            shop_count = 0
+            if serializer.validated_data["cascade"]:
+                shop_count = Shop.objects.filter(pool_customer__in=pools).update(
+                    **changes
+                )
+            pool_count = pools.update(**changes)
+            if changes["is_calculated"]:
+                release_cabinets(pools)
+            else:
+                for pool in pools.filter(cabinet__isnull=True).order_by("pk"):
+                    reclaim_cabinet(pool)
+            invalidate_pool_cache()
+        return Response({"pools": pool_count, "shops": shop_count})
+
+
+class ShopViewSet(
+    ReplicaReadMixin, CachedListMixin, ConditionalGetMixin, viewsets.ModelViewSet
+):
     serializer_class = ShopSerializer
     permission_classes = [permissions.IsAuthenticated]
-    pagination_class = CustomerUserPagination
-    filter_backends = [DjangoFilterBackend]
+    pagination_class = PoolShopPagination
+    filter_backends = [DjangoFilterBackend, PoolNameSearchFilter]
     filterset_class = ShopFilter
+    search_pool_field = "pool_customer"
     queryset = Shop.objects.all().order_by("-created_at")
-
-
+    replica_actions = {"list", "export", "items"}
 
     def perform_create(self, serializer):
         serializer.save(user=self.request.user)
 
+    @action(
+        detail=False,
+        methods=["get"],
+        url_path=r"export/(?P<export_format>csv|ndjson)",
+    )
+    def export(self, request, export_format=None):
+        queryset = self.filter_queryset(self.get_queryset())
+        return export_response(queryset, SHOP_EXPORT_FIELDS, export_format, "shops")
+
+    @action(detail=False, methods=["post"])
+    def settle(self, request):
+        """Set ``is_calculated`` on the selected shops with one UPDATE."""
+        serializer = SettleSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        shops = serializer.filter_queryset(Shop.objects.all())
+        now = timezone.now()
+        with transaction.atomic():
+            # Pools embed their shops, so touch them for conditional GETs.
+            Pool.objects.filter(pk__in=shops.values("pool_customer")).update(
+                updated_at=now
+            )
+            shop_count = shops.update(
+                is_calculated=serializer.validated_data["is_calculated"],
+                updated_at=now,
+            )
+            invalidate_pool_cache()
+        return Response({"pools": 0, "shops": shop_count})
+
+    @action(detail=False, methods=["get"])
+    def items(self, request):
+        """Quantity and revenue per item name over the filtered shops."""
+        shops = self.filter_queryset(self.get_queryset()).order_by()
+        rows = (
+            ShopLineItem.objects.filter(shop__in=shops.values("pk"))
+            .values("name")
+            .annotate(quantity=Count("id"), total=Sum("amount"))
+            .order_by("-total", "name")
+        )
+        return Response(ItemSalesSerializer(rows, many=True).data)
+
+    @action(detail=False, methods=["post"])
+    def bulk(self, request):
+        """
+        Create and update many shops in one transaction. Items with an
+        ``id`` update that shop; items without one are created.
+        """
+        serializer = ShopBulkSerializer(data=request.data, many=True)
+        serializer.is_valid(raise_exception=True)
+        shops = serializer.save(user=request.user)
+        created = any("id" not in item for item in serializer.validated_data)
+        return Response(
+            ShopSerializer(shops, many=True).data,
+            status=status.HTTP_201_CREATED if created else status.HTTP_200_OK,
+        )
+
 
 class ShopDetailAPIView(APIView):
     def patch(self, request, pk):
@@ -49,3 +261,27 @@ class ShopDetailAPIView(APIView):
             serializer.save()
             return Response(serializer.data)
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+
+
+class FinancialReportAPIView(ReplicaReadMixin, APIView):
+    """
+    Pool, shop and rent totals grouped by day, week or month.
+
+    Query params: ``start`` and ``end`` (YYYY-MM-DD, inclusive),
+    ``granularity`` (day/week/month) and an optional ``user`` id.
+    """
+
+    permission_classes = [permissions.IsAuthenticated]
+
+    def get(self, request):
+        params = ReportQuerySerializer(data=request.query_params)
+        params.is_valid(raise_exception=True)
+        rows = build_financial_report(**params.validated_data)
+        return Response(
+            {
+                "start": params.validated_data["start"],
+                "end": params.validated_data["end"],
+                "granularity": params.validated_data["granularity"],
+                "results": ReportRowSerializer(rows, many=True).data,
+            }
+        )
@@ -1,27 +1,26 @@
-import json
+from apps.common.renderers import FastJSONRenderer
 
-from rest_framework.renderers import JSONRenderer
 
-
-class ProfileJsonRenderers(JSONRenderer):
+class ProfileEnvelopeRenderer(FastJSONRenderer):
     charset = "utf-8"
+    envelope = None
 
     def render(self, data, accepted_media_type=None, renderer_context=None):
         status_code = renderer_context["response"].status_code
         errors = data.get("error", None)
         if errors is not None:
-            return super(ProfileJsonRenderers, self).render(data)
+            return super().render(data)
 
-        return json.dumps({"status_code": status_code, "profile": data})
+        return super().render(
+            {"status_code": status_code, self.envelope: data},
+            accepted_media_type,
+            renderer_context,
+        )
 
 
-class ProfilesJsonRenderers(JSONRenderer):
-    charset = "utf-8"
+class ProfileJsonRenderers(ProfileEnvelopeRenderer):
+    envelope = "profile"
 
-    def render(self, data, accepted_media_type=None, renderer_context=None):
-        status_code = renderer_context["response"].status_code
-        errors = data.get("error", None)
-        if errors is not None:
-            return super(ProfilesJsonRenderers, self).render(data)
 
-        return json.dumps({"status_code": status_code, "profiles": data})
+class ProfilesJsonRenderers(ProfileEnvelopeRenderer):
+    envelope = "profiles"
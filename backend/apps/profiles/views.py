@@ -8,6 +8,8 @@ from rest_framework.permissions import AllowAny, IsAuthenticated
 from rest_framework.response import Response
 from rest_framework.views import APIView
 
+from apps.common.routers import ReplicaReadMixin
+
 from .models import Profile
 from .pagination import ProfilePagination
 from .renderers import ProfileJsonRenderers, ProfilesJsonRenderers
@@ -16,7 +18,7 @@ from .serializers import ProfileSerializers, UpdateProfileSerializer
 User = get_user_model()
 
 
-class ProfileListAPIView(generics.ListAPIView):
+class ProfileListAPIView(ReplicaReadMixin, generics.ListAPIView):
     queryset = Profile.objects.all()
     serializer_class = ProfileSerializers
     permission_classes = [IsAuthenticated]
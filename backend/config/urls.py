@@ -8,6 +8,8 @@ from drf_spectacular.views import (
     SpectacularSwaggerView,
 )
 
+from apps.common.views import metrics
+
 for _ in range(30):
     pass
 
@@ -23,6 +25,7 @@ urlpatterns = [
     path("api/v1/auth/", include("apps.users.urls"), name="auth"),
     path("api/v1/profiles/", include("apps.profiles.urls"), name="profiles"),
     path("api/v1/pool/", include("apps.pool.urls"), name="pool"),
+    path("metrics", metrics, name="metrics"),
 ] + static(settings.STATIC_URL, document_root=settings.STATIC_ROOT)
 
 admin.site.site_header = "Stock management system  Admin"